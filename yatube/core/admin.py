@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'state',
+        'run_at',
+        'attempts',
+        'locked_by',
+    )
+    list_filter = ('state', 'name')
+    readonly_fields = ('last_error',)
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,170 @@
+"""
+ASGI-адаптер для Django 2.2, в котором нет своего ASGI-обработчика.
+
+Цикл событий принимает соединения и дочитывает тела запросов, а сами
+view выполняет обычный WSGIHandler в пуле из ASGI_THREADS потоков.
+ORM в Django 2.2 синхронный, поэтому пул — это и предел одновременных
+обращений к базе; медленные клиенты при этом потоки не занимают.
+Если в очереди к пулу уже ASGI_MAX_PENDING запросов, новые сразу
+получают 503, а не ждут в очереди без конца.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+OVERLOADED_BODY = b'Service Unavailable'
+
+
+def build_environ(scope, body):
+    """WSGI environ из scope HTTP-запроса ASGI; body — файл с телом."""
+    # PEP 3333: декодированный путь и строка запроса — байты
+    # в строке latin-1
+    path = scope['path'].encode('utf-8')
+    root_path = scope.get('root_path', '').encode('utf-8')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.decode('latin-1'),
+        'PATH_INFO': path.decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = name
+        else:
+            key = f'HTTP_{name}'
+        if key in environ:
+            # Повторные заголовки склеиваются через запятую (RFC 7230)
+            value = f'{environ[key]},{value}'
+        environ[key] = value
+    return environ
+
+
+def run_wsgi(application, environ):
+    """
+    Вызывает WSGI-приложение и собирает ответ целиком в том же потоке:
+    close() шлёт request_finished, а он закрывает соединения с базой
+    именно текущего потока.
+    """
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = headers
+
+    response = application(environ, start_response)
+    try:
+        body = b''.join(response)
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return started['status'], started['headers'], body
+
+
+class AsgiHandler:
+    """ASGI 3-приложение поверх WSGI-приложения и пула потоков."""
+
+    def __init__(self, wsgi_application, threads=None, max_pending=None):
+        self.wsgi_application = wsgi_application
+        self.threads = threads or settings.ASGI_THREADS
+        if max_pending is None:
+            max_pending = settings.ASGI_MAX_PENDING
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix='asgi'
+        )
+        # Запросы, отданные в пул: выполняются и ждут свободного потока
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """
+        Тело запроса; большие (загрузки картинок) уходят на диск, как
+        у FILE_UPLOAD_MAX_MEMORY_SIZE. None, если клиент отключился.
+        """
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    async def http(self, scope, receive, send):
+        if self.in_flight >= self.threads + self.max_pending:
+            await self.respond(
+                send, 503,
+                [('Content-Type', 'text/plain'), ('Retry-After', '1')],
+                OVERLOADED_BODY
+            )
+            return
+        # Место занимаем до чтения тела: медленные загрузки тоже
+        # держат память и файлы и должны упираться в тот же предел
+        self.in_flight += 1
+        body = None
+        try:
+            body = await self.read_body(receive)
+            if body is None:
+                return
+            status, headers, content = await asyncio.get_running_loop(
+            ).run_in_executor(
+                self.executor,
+                run_wsgi, self.wsgi_application, build_environ(scope, body)
+            )
+        finally:
+            self.in_flight -= 1
+            if body is not None:
+                body.close()
+        await self.respond(send, status, headers, content)
+
+    async def respond(self, send, status, headers, content):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': content})
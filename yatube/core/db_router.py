@@ -0,0 +1,48 @@
+"""
+Роутер баз: запись всегда в default, чтение — в реплику, если
+ReplicaMiddleware выбрала её для текущего запроса.
+
+Состояние хранится в thread-local: каждый запрос обслуживается
+своим потоком, и middleware сбрасывает его в начале и в конце.
+"""
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+_state = threading.local()
+
+
+def use_replica(alias):
+    _state.replica = alias
+
+
+def reset():
+    _state.replica = None
+    _state.wrote = False
+
+
+def reading_replica():
+    """Читает ли текущий запрос с реплики."""
+    return bool(getattr(_state, 'replica', None))
+
+
+def wrote():
+    """Была ли запись в текущем запросе."""
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'replica', None) or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии default, связи между ними безопасны
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
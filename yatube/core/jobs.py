@@ -0,0 +1,248 @@
+"""
+Очередь фоновых задач в базе (модель Job), без внешнего брокера.
+
+Задача пишется в той же транзакции, что и данные, из-за которых она
+нужна: откат отменяет и её, а воркер не увидит задачу до коммита.
+Воркеры (manage.py run_workers) забирают задачи пачками под арендой
+JOBS_LEASE секунд, повторяют упавшие с растущей задержкой, а задача
+с batch=True получает одним вызовом аргументы всех своих ожидающих
+запусков — например, один пересчёт на пост вместо одного на каждый
+комментарий.
+
+Задачи объявляются в модулях tasks.py приложений:
+
+    @task(batch=True)
+    def index_posts(payloads):
+        ...
+
+    index_posts.delay(post_id=post.pk)
+"""
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DatabaseError, close_old_connections, connection, transaction
+)
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+
+class Task:
+    def __init__(self, func, name, batch, max_attempts):
+        self.func = func
+        self.name = name
+        self.batch = batch
+        self.max_attempts = max_attempts
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, **payload):
+        return enqueue(self.name, **payload)
+
+    def delay_many(self, payloads):
+        return enqueue_many(self.name, payloads)
+
+    def run(self, payloads):
+        if self.batch:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(**payload)
+
+
+def task(name=None, batch=False, max_attempts=None):
+    """
+    Регистрирует функцию как задачу. Имя по умолчанию —
+    «приложение.функция». Обычная задача вызывается с аргументами
+    delay(), пакетная — со списком их словарей.
+    """
+    def decorator(func):
+        task_name = name or (
+            f'{func.__module__.split(".")[0]}.{func.__name__}'
+        )
+        REGISTRY[task_name] = Task(
+            func, task_name, batch,
+            max_attempts or settings.JOBS_MAX_ATTEMPTS
+        )
+        return REGISTRY[task_name]
+    return decorator
+
+
+def enqueue(name, run_at=None, **payload):
+    """
+    Ставит задачу name в очередь; run_at — не раньше этого времени.
+    При JOBS_EAGER выполняет её сразу, в текущем потоке (разовые
+    скрипты, окружения без воркеров); отложенная на будущее задача
+    и тогда ждёт воркера, иначе повтор «через час» шёл бы по кругу.
+    """
+    return enqueue_many(name, [payload], run_at=run_at)
+
+
+def enqueue_many(name, payloads, run_at=None):
+    """Ставит в очередь запуски name со всеми payloads одним INSERT."""
+    if name not in REGISTRY:
+        raise KeyError(f'Неизвестная задача {name}')
+    payloads = list(payloads)
+    now = timezone.now()
+    if settings.JOBS_EAGER and (run_at is None or run_at <= now):
+        REGISTRY[name].run(payloads)
+        return None
+    run_at = run_at or now
+    return Job.objects.bulk_create(
+        (
+            Job(
+                name=name,
+                payload=json.dumps(payload, separators=(',', ':')),
+                run_at=run_at,
+            )
+            for payload in payloads
+        ),
+        batch_size=settings.JOBS_BATCH_SIZE
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _due(now):
+    return Job.objects.filter(state=Job.PENDING, run_at__lte=now).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    )
+
+
+def claim(worker, limit):
+    """
+    Берёт в аренду до limit задач, срок которых наступил.
+    На Postgres занятые другими воркерами строки пропускаются
+    (SKIP LOCKED). На SQLite задачи берутся одним UPDATE с подзапросом:
+    чтение и запись в одной транзакции повышали бы блокировку с чтения
+    до записи, а это при нескольких воркерах — database is locked.
+    """
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.JOBS_LEASE)
+    due = _due(now).order_by('run_at', 'pk')
+    lease = {
+        'locked_by': worker,
+        'locked_until': locked_until,
+        'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                due.select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:limit]
+            )
+            _due(now).filter(pk__in=ids).update(**lease)
+    else:
+        # Условия повторяются снаружи подзапроса: задачу, которую
+        # успел занять другой воркер, update не тронет
+        _due(now).filter(pk__in=due.values('pk')[:limit]).update(**lease)
+    return list(
+        Job.objects.filter(
+            locked_by=worker, locked_until=locked_until
+        ).order_by('pk')
+    )
+
+
+def _fail(jobs, task, error):
+    now = timezone.now()
+    for job in jobs:
+        job.last_error = error
+        job.locked_by = ''
+        job.locked_until = None
+        if task is None or job.attempts >= task.max_attempts:
+            job.state = Job.FAILED
+            logger.error('Задача %s не выполнена: %s', job, error)
+        else:
+            # 1, 2, 4, ... × JOBS_RETRY_DELAY
+            job.run_at = now + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        job.save(update_fields=[
+            'last_error', 'locked_by', 'locked_until', 'state', 'run_at'
+        ])
+
+
+def _execute(task, jobs):
+    """Выполняет задачи и удаляет их; текст ошибки или None."""
+    try:
+        with transaction.atomic():
+            task.run([json.loads(job.payload) for job in jobs])
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def run_pending(limit=None, worker=None):
+    """
+    Выполняет одну пачку задач; возвращает, сколько задач взято.
+    Задачи одного имени выполняются одним вызовом, если batch=True;
+    если такой вызов упал, задачи пачки выполняются по одной, и
+    откладывается только та, что падает сама.
+    """
+    worker = worker or worker_name()
+    jobs = claim(worker, limit or settings.JOBS_BATCH_SIZE)
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job.name, []).append(job)
+    for name, group in groups.items():
+        task = REGISTRY.get(name)
+        if task is None:
+            _fail(group, None, f'Неизвестная задача {name}')
+            continue
+        if task.batch and len(group) > 1:
+            if _execute(task, group) is None:
+                continue
+        for job in group:
+            error = _execute(task, [job])
+            if error is not None:
+                _fail([job], task, error)
+    return len(jobs)
+
+
+def drain(worker=None):
+    """Выполняет задачи, пока есть те, чей срок наступил."""
+    total = 0
+    while True:
+        done = run_pending(worker=worker)
+        if not done:
+            return total
+        total += done
+
+
+def work(idle_sleep=None, batch_size=None, once=False):
+    """Цикл воркера: пачка за пачкой, без задач — пауза."""
+    worker = worker_name()
+    idle_sleep = idle_sleep or settings.JOBS_IDLE_SLEEP
+    while True:
+        close_old_connections()
+        try:
+            done = run_pending(limit=batch_size, worker=worker)
+        except DatabaseError:
+            # Например, database is locked: воркер не должен умирать,
+            # аренда взятых задач истечёт, и их заберут снова
+            logger.exception('Воркер %s: ошибка базы', worker)
+            done = 0
+        if done:
+            continue
+        if once:
+            return
+        time.sleep(idle_sleep)
@@ -0,0 +1,184 @@
+"""
+Исходящая почта через очередь core.jobs.
+
+queue_mail() ставит письмо задачей core.send_mails (core/tasks.py).
+Воркер получает все ожидающие письма пачкой, и send_batch()
+отправляет их через одно соединение с почтовым сервером, а не
+открывает соединение на каждое письмо.
+Одному адресу уходит не больше EMAIL_RATE_LIMIT писем за
+EMAIL_RATE_WINDOW секунд, остальные откладываются до следующего окна.
+
+RotatingFileBackend — файловый бэкенд для разработки: каждая пачка
+пишется одним файлом, а закрытые файлы дописываются в суточные
+архивы .log.gz, которые хранятся EMAIL_ARCHIVE_DAYS дней.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.filebased import EmailBackend
+from django.utils import timezone
+
+from .jobs import enqueue_many
+
+logger = logging.getLogger(__name__)
+
+RATE_KEY = 'mail:rate:{window}:{address}'
+ARCHIVE_DIR = 'archive'
+
+
+def queue_mail(subject, body, recipients, from_email=None, html=None):
+    """Ставит письмо в очередь; recipients — список адресов."""
+    queue_mails([{
+        'subject': subject,
+        'body': body,
+        'to': list(recipients),
+        'from_email': from_email or settings.DEFAULT_FROM_EMAIL,
+        'html': html,
+    }])
+
+
+def queue_mails(messages):
+    """Ставит в очередь пачку писем (словарей как в queue_mail)."""
+    enqueue_many('core.send_mails', messages)
+
+
+def _window():
+    return int(time.time() // settings.EMAIL_RATE_WINDOW)
+
+
+def _rate_key(address, window):
+    digest = hashlib.md5(address.lower().encode()).hexdigest()
+    return RATE_KEY.format(window=window, address=digest)
+
+
+def _next_window_at(window):
+    """Когда начнётся окно лимита, следующее за window."""
+    next_window = (window + 1) * settings.EMAIL_RATE_WINDOW
+    return timezone.now() + timedelta(seconds=next_window - time.time())
+
+
+def _within_limit(addresses, window, sent):
+    """Не превысит ли письмо лимит кого-то из получателей."""
+    keys = [_rate_key(address, window) for address in addresses]
+    counts = cache.get_many(keys)
+    return all(
+        counts.get(key, 0) + sent.get(key, 0) < settings.EMAIL_RATE_LIMIT
+        for key in keys
+    )
+
+
+def _count(addresses, window, sent):
+    for address in addresses:
+        key = _rate_key(address, window)
+        sent[key] = sent.get(key, 0) + 1
+
+
+def _save_counts(sent):
+    timeout = settings.EMAIL_RATE_WINDOW * 2
+    for key, count in sent.items():
+        # add + incr: счётчик общий для всех воркеров
+        cache.add(key, 0, timeout)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            # Ключ успел истечь между add и incr
+            cache.set(key, count, timeout)
+
+
+def build_message(message):
+    email = EmailMultiAlternatives(
+        message['subject'],
+        message['body'],
+        message['from_email'],
+        message['to'],
+    )
+    if message.get('html'):
+        email.attach_alternative(message['html'], 'text/html')
+    return email
+
+
+def send_batch(messages):
+    """
+    Отправляет пачку писем через одно соединение. Письмо, на котором
+    сервер ответил ошибкой, ставится в очередь заново, а не роняет
+    пачку: иначе уже отправленные письма ушли бы повторно.
+    """
+    window = _window()
+    sent, deferred, failed = {}, [], []
+    connection = get_connection()
+    connection.open()
+    try:
+        for message in messages:
+            if not _within_limit(message['to'], window, sent):
+                deferred.append(message)
+                continue
+            try:
+                connection.send_messages([build_message(message)])
+            except (smtplib.SMTPException, OSError) as error:
+                attempts = message.get('attempts', 0) + 1
+                if attempts >= settings.JOBS_MAX_ATTEMPTS:
+                    logger.error(
+                        'Письмо %s не отправлено: %s', message['to'], error
+                    )
+                else:
+                    failed.append(dict(message, attempts=attempts))
+                continue
+            _count(message['to'], window, sent)
+    finally:
+        connection.close()
+        _save_counts(sent)
+    if deferred:
+        enqueue_many(
+            'core.send_mails', deferred, run_at=_next_window_at(window)
+        )
+    if failed:
+        enqueue_many(
+            'core.send_mails', failed,
+            run_at=timezone.now() + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY
+            )
+        )
+
+
+class RotatingFileBackend(EmailBackend):
+    """
+    Файловый бэкенд: пачка писем — один файл, который после закрытия
+    соединения дописывается в архив archive/ГГГГ-ММ-ДД.log.gz.
+    Несколько gzip-потоков подряд — корректный gzip-файл, поэтому
+    архив за день читается целиком через gzip.open или zcat.
+    """
+
+    def close(self):
+        name = getattr(self, '_fname', None)
+        super().close()
+        if name and os.path.exists(name):
+            self.archive(name)
+        self._fname = None
+
+    def archive(self, name):
+        directory = os.path.join(self.file_path, ARCHIVE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        today = timezone.now().date()
+        target = os.path.join(directory, f'{today.isoformat()}.log.gz')
+        with open(name, 'rb') as source:
+            with gzip.open(target, 'ab') as archive:
+                shutil.copyfileobj(source, archive)
+        os.remove(name)
+        self.purge(directory, today)
+
+    def purge(self, directory, today):
+        oldest = (
+            today - timedelta(days=settings.EMAIL_ARCHIVE_DAYS)
+        ).isoformat()
+        for filename in os.listdir(directory):
+            if filename.endswith('.log.gz') and filename[:10] < oldest:
+                os.remove(os.path.join(directory, filename))
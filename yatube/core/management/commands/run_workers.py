@@ -0,0 +1,71 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+from core.models import Job
+
+
+def _work(options):
+    jobs.work(
+        idle_sleep=options['idle_sleep'],
+        batch_size=options['batch_size'],
+        once=options['once'],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает воркеры очереди фоновых задач core.jobs: '
+        'превью картинок, раскладку лент, поисковый индекс'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов-воркеров'
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Сколько задач брать за раз (JOBS_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--idle-sleep', type=float,
+            help='Пауза без задач, секунд (JOBS_IDLE_SLEEP)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти (для cron)'
+        )
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Вернуть задачи в состоянии failed в очередь и выйти'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            count = Job.objects.filter(state=Job.FAILED).update(
+                state=Job.PENDING, attempts=0
+            )
+            self.stdout.write(f'Возвращено в очередь: {count}')
+            return
+        if options['processes'] <= 1:
+            _work(options)
+            return
+        # Соединения с базой не должны достаться дочерним процессам
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_work, args=(options,), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Запущено воркеров: {len(workers)}')
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
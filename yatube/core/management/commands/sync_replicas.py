@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует SQLite-базу default в файлы реплик из DATABASE_REPLICAS '
+        '(для локальной проверки чтения с реплик)'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Команда только для SQLite; реплики Postgres '
+                'настраиваются потоковой репликацией'
+            )
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст')
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            path = settings.DATABASES[alias]['NAME']
+            connections[alias].close()
+            target = sqlite3.connect(path)
+            try:
+                # Онлайн-бэкап: консистентная копия без остановки записи
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: {path}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.template_cache import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны проекта: прогрев cached.Loader '
+        'и проверка, что шаблоны без синтаксических ошибок'
+    )
+
+    def handle(self, *args, **options):
+        count, seconds, errors = warm_templates()
+        self.stdout.write(
+            f'Скомпилировано шаблонов: {count} за {seconds * 1000:.0f} мс'
+        )
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(f'Шаблонов с ошибками: {len(errors)}')
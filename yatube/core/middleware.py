@@ -0,0 +1,81 @@
+import random
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from . import db_router
+
+PIN_COOKIE = 'db_primary'
+QUERIES_HEADER = 'X-DB-Queries'
+
+
+class ReplicaMiddleware:
+    """
+    GET-запросы к view из REPLICA_VIEWS читают из случайной реплики.
+    После записи пользователь REPLICA_PIN_SECONDS секунд читает
+    только из default (кука PIN_COOKIE), чтобы видеть свои изменения
+    даже при отставании реплик. При DB_QUERIES_HEADER в ответ
+    добавляется число запросов по каждой базе.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def replica_allowed(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return False
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if PIN_COOKIE in request.COOKIES:
+            return False
+        try:
+            view_name = resolve(request.path_info).view_name
+        except Resolver404:
+            return False
+        return view_name in settings.REPLICA_VIEWS
+
+    def __call__(self, request):
+        db_router.reset()
+        if self.replica_allowed(request):
+            db_router.use_replica(random.choice(settings.DATABASE_REPLICAS))
+        queries = Counter()
+        try:
+            with ExitStack() as stack:
+                if settings.DB_QUERIES_HEADER:
+                    for alias in connections:
+                        stack.enter_context(
+                            connections[alias].execute_wrapper(
+                                QueryCounter(queries, alias)
+                            )
+                        )
+                response = self.get_response(request)
+            wrote = db_router.wrote()
+        finally:
+            db_router.reset()
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        if settings.DB_QUERIES_HEADER:
+            response[QUERIES_HEADER] = ', '.join(
+                f'{alias}={count}' for alias, count in sorted(queries.items())
+            )
+        return response
+
+
+class QueryCounter:
+    """execute_wrapper, считающий запросы к базе alias."""
+
+    def __init__(self, counter, alias):
+        self.counter = counter
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counter[self.alias] += 1
+        return execute(sql, params, many, context)
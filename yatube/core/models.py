@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача очереди core.jobs; выполненные удаляются."""
+    PENDING = 'pending'
+    FAILED = 'failed'
+    STATES = (
+        (PENDING, 'Ожидает'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        # Воркер выбирает ожидающие задачи, срок которых наступил
+        indexes = [
+            models.Index(fields=['state', 'run_at'], name='job_due_idx'),
+        ]
+
+    name = models.CharField('Задача', max_length=100)
+    payload = models.TextField('Аргументы (JSON)', default='{}')
+    state = models.CharField(
+        'Состояние', max_length=10, choices=STATES, default=PENDING
+    )
+    run_at = models.DateTimeField('Выполнить не раньше', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    locked_until = models.DateTimeField(
+        'Занята до', null=True, blank=True,
+        help_text='Если воркер упал, после этого задачу заберёт другой'
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
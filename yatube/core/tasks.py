@@ -0,0 +1,7 @@
+from .jobs import task
+from . import mail
+
+
+@task(batch=True)
+def send_mails(messages):
+    mail.send_batch(messages)
@@ -0,0 +1,39 @@
+"""
+Предзагрузка шаблонов. С cached.Loader (prod) скомпилированные
+шаблоны остаются в памяти процесса, и первые запросы не тратят
+время на чтение и разбор файлов; без него это просто проверка,
+что все шаблоны компилируются.
+"""
+import os
+import time
+
+from django.template import (
+    TemplateDoesNotExist, TemplateSyntaxError, engines
+)
+
+
+def template_names(engine):
+    """Имена всех шаблонов из TEMPLATES['DIRS']."""
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt')):
+                    path = os.path.join(root, filename)
+                    yield os.path.relpath(path, directory).replace(
+                        os.sep, '/'
+                    )
+
+
+def warm_templates():
+    """Компилирует все шаблоны; возвращает (число, секунды, ошибки)."""
+    engine = engines['django'].engine
+    started = time.perf_counter()
+    count, errors = 0, {}
+    for name in sorted(set(template_names(engine))):
+        try:
+            engine.get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+            errors[name] = str(error)
+        else:
+            count += 1
+    return count, time.perf_counter() - started, errors
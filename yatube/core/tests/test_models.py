@@ -0,0 +1,163 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core import jobs
+from core.models import Job
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+
+User = get_user_model()
+
+
+class DatabaseTuningTest(TestCase):
+    def test_sqlite_pragmas_applied(self):
+        """Новое соединение SQLite получает PRAGMA из настроек."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('только для SQLite')
+        with connection.cursor() as cursor:
+            for name in ('busy_timeout', 'cache_size'):
+                with self.subTest(name=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(
+                        cursor.fetchone()[0], settings.SQLITE_PRAGMAS[name]
+                    )
+
+
+@override_settings(JOBS_EAGER=False)
+class JobQueueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='job-author')
+        cls.reader = User.objects.create_user(username='job-reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        # Уведомление о подписке из setUpTestData здесь не нужно
+        Job.objects.all().delete()
+
+    def register(self, name, func, **kwargs):
+        self.addCleanup(jobs.REGISTRY.pop, name, None)
+        return jobs.task(name, **kwargs)(func)
+
+    def test_post_side_effects_are_queued_and_batched(self):
+        """Посты и комментарии ставят задачи, воркер схлопывает повторы."""
+        post = Post.objects.create(text='пост', author=self.author)
+        for num in range(3):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'комментарий {num}'
+            )
+        self.assertEqual(
+            sorted(Job.objects.values_list('name', flat=True)),
+            ['posts.fan_out_posts'] + ['posts.index_posts'] * 4
+            + ['posts.notify_new_posts']
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(jobs.drain(), 6)
+        # Четыре задачи индекса — одна переиндексация поста
+        self.assertEqual(
+            sum('"posts_comment"' in query['sql'] for query in context), 1
+        )
+        self.assertFalse(Job.objects.exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_batch_task_gets_all_payloads(self):
+        calls = []
+        self.register('test.collect', calls.append, batch=True)
+        for num in range(3):
+            jobs.enqueue('test.collect', num=num)
+        call_command('run_workers', once=True)
+        self.assertEqual(calls, [[{'num': 0}, {'num': 1}, {'num': 2}]])
+
+    @override_settings(JOBS_RETRY_DELAY=60)
+    def test_retry_then_fail(self):
+        """Упавшая задача откладывается, после последней попытки — failed."""
+        def broken(**kwargs):
+            raise RuntimeError('сломалось')
+
+        self.register('test.broken', broken, max_attempts=2)
+        jobs.enqueue('test.broken', num=1)
+        self.assertEqual(jobs.run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual(
+            (job.state, job.attempts, job.locked_by), (Job.PENDING, 1, '')
+        )
+        self.assertIn('сломалось', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        # Срок повтора не наступил
+        self.assertEqual(jobs.run_pending(), 0)
+        Job.objects.update(run_at=timezone.now())
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.attempts), (Job.FAILED, 2))
+        call_command('run_workers', retry_failed=True, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.attempts), (Job.PENDING, 0))
+
+    def test_expired_lease_is_reclaimed(self):
+        """Задачу упавшего воркера заберёт другой после аренды."""
+        calls = []
+        self.register('test.single', lambda **kwargs: calls.append(kwargs))
+        jobs.enqueue('test.single', num=1)
+        self.assertEqual(len(jobs.claim('упавший', 10)), 1)
+        self.assertEqual(jobs.run_pending(), 0)
+        Job.objects.update(locked_until=timezone.now())
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, [{'num': 1}])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager(self):
+        post = Post.objects.create(text='сразу', author=self.author)
+        self.assertFalse(Job.objects.exists())
+        self.assertTrue(TimelineEntry.objects.filter(post=post).exists())
+
+    def test_bad_payload_fails_alone(self):
+        """Упавшая пачка выполняется по одной: откладывается только плохая."""
+        calls = []
+
+        def collect(payloads):
+            if any(payload['num'] == 2 for payload in payloads):
+                raise ValueError('плохой payload')
+            calls.extend(payload['num'] for payload in payloads)
+
+        self.register('test.picky', collect, batch=True, max_attempts=1)
+        jobs.enqueue_many('test.picky', [{'num': num} for num in range(4)])
+        self.assertEqual(jobs.run_pending(), 4)
+        self.assertEqual(calls, [0, 1, 3])
+        job = Job.objects.get()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertIn('"num":2', job.payload)
+
+    def test_claim_is_one_update_on_sqlite(self):
+        """На SQLite задачи берутся без чтения перед записью."""
+        if connection.features.has_select_for_update_skip_locked:
+            self.skipTest('только без SKIP LOCKED')
+        for num in range(3):
+            jobs.enqueue('posts.index_posts', post_id=num)
+        with CaptureQueriesContext(connection) as context:
+            claimed = jobs.claim('воркер', 2)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(
+            [query['sql'].split()[0] for query in context],
+            ['UPDATE', 'SELECT']
+        )
+        self.assertEqual(jobs.claim('другой', 5)[0].pk, claimed[-1].pk + 1)
+
+    def test_worker_survives_database_error(self):
+        """Ошибка базы в воркере пишется в лог, а не роняет процесс."""
+        def locked(worker, limit):
+            raise OperationalError('database is locked')
+
+        self.addCleanup(setattr, jobs, 'claim', jobs.claim)
+        jobs.claim = locked
+        with self.assertLogs('core.jobs', 'ERROR') as logs:
+            jobs.work(once=True)
+        self.assertIn('database is locked', logs.output[0])
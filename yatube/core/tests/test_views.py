@@ -0,0 +1,376 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+import shutil
+import smtplib
+import tempfile
+import threading
+import time
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.mail.backends import locmem
+from django.db import router
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from core.asgi import AsgiHandler
+from core.jobs import drain
+from core.mail import queue_mail
+from core.middleware import PIN_COOKIE, ReplicaMiddleware
+from core.models import Job
+from core.template_cache import warm_templates
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def reading_view(self, request):
+        self.seen.append(router.db_for_read(Post))
+        return HttpResponse()
+
+    def writing_view(self, request):
+        self.seen.append(router.db_for_write(Post))
+        return HttpResponse()
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_reads_from_replica_until_write(self):
+        """Ленты читаются с реплики, после записи — только из default."""
+        reading = ReplicaMiddleware(self.reading_view)
+        response = reading(self.factory.get(reverse('posts:index')))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        reading(self.factory.get(reverse('posts:post_create')))
+        response = ReplicaMiddleware(self.writing_view)(
+            self.factory.post(reverse('posts:post_create'))
+        )
+        self.assertEqual(
+            response.cookies[PIN_COOKIE]['max-age'],
+            settings.REPLICA_PIN_SECONDS
+        )
+        pinned = self.factory.get(reverse('posts:index'))
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        reading(pinned)
+        self.assertEqual(
+            self.seen, ['replica1', 'default', 'default', 'default']
+        )
+        # Вне запроса чтение снова идёт в default
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    @override_settings(DB_QUERIES_HEADER=True)
+    def test_queries_header(self):
+        """Ответ сообщает число запросов по каждой базе."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertRegex(response['X-DB-Queries'], r'^default=\d+$')
+
+
+class TemplateWarmupTest(TestCase):
+    @override_settings(TEMPLATES=[dict(
+        settings.TEMPLATES[0],
+        APP_DIRS=False,
+        OPTIONS=dict(
+            settings.TEMPLATES[0]['OPTIONS'],
+            loaders=[('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ])],
+        ),
+    )])
+    def test_warm_templates_fills_cached_loader(self):
+        """Все шаблоны компилируются и остаются в cached.Loader."""
+        count, _, errors = warm_templates()
+        self.assertEqual(errors, {})
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIn('posts/index.html', loader.get_template_cache)
+        self.assertGreaterEqual(len(loader.get_template_cache), count)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+def asgi_request(application, path, method='GET', chunks=(b'',),
+                 headers=()):
+    """Прогоняет один HTTP-запрос через ASGI-приложение."""
+    messages = []
+    pending = list(chunks)
+
+    async def receive():
+        body = pending.pop(0)
+        return {
+            'type': 'http.request', 'body': body, 'more_body': bool(pending)
+        }
+
+    async def send(message):
+        messages.append(message)
+
+    path, _, query = path.partition('?')
+    asyncio.run(application(
+        {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query.encode(),
+            'headers': list(headers),
+        },
+        receive, send
+    ))
+    start, body = messages
+    return start['status'], dict(start['headers']), body['body']
+
+
+class AsgiTest(TestCase):
+    def test_django_view_through_pool(self):
+        """Страница Django отдаётся через ASGI из потока пула."""
+        application = AsgiHandler(WSGIHandler(), threads=2)
+        self.addCleanup(application.executor.shutdown)
+        status, headers, body = asgi_request(
+            application, reverse('about:author')
+        )
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertIn(b'text/html', headers[b'content-type'])
+        self.assertIn('<html', body.decode())
+
+    def test_environ_and_chunked_body(self):
+        seen = {}
+
+        def echo(environ, start_response):
+            seen.update(environ)
+            seen['thread'] = threading.current_thread().name
+            start_response('201 Created', [('X-Echo', 'yes')])
+            return [environ['wsgi.input'].read()]
+
+        application = AsgiHandler(echo, threads=1)
+        self.addCleanup(application.executor.shutdown)
+        status, headers, body = asgi_request(
+            application, '/путь/?q=1', method='POST',
+            chunks=(b'ab', b'cd'),
+            headers=[(b'content-type', b'text/plain'), (b'x-a', b'1'),
+                     (b'x-a', b'2')]
+        )
+        self.assertEqual((status, body), (201, b'abcd'))
+        self.assertEqual(headers[b'x-echo'], b'yes')
+        self.assertEqual(
+            seen['PATH_INFO'].encode('latin-1').decode(), '/путь/'
+        )
+        self.assertEqual(seen['QUERY_STRING'], 'q=1')
+        self.assertEqual(seen['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(seen['HTTP_X_A'], '1,2')
+        self.assertTrue(seen['thread'].startswith('asgi'))
+
+    def test_overload_returns_503(self):
+        """Сверх пула и очереди запросы сразу получают 503."""
+        release = threading.Event()
+
+        def slow(environ, start_response):
+            release.wait(5)
+            start_response('200 OK', [])
+            return [b'ok']
+
+        application = AsgiHandler(slow, threads=1, max_pending=0)
+        self.addCleanup(application.executor.shutdown)
+        results = []
+        first = threading.Thread(
+            target=lambda: results.append(asgi_request(application, '/'))
+        )
+        first.start()
+        while not application.in_flight:
+            time.sleep(0.01)
+        results.append(asgi_request(application, '/'))
+        release.set()
+        first.join()
+        overloaded, served = results
+        self.assertEqual(overloaded[0], HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertEqual(overloaded[1][b'retry-after'], b'1')
+        self.assertEqual(served[0], HTTPStatus.OK)
+
+    def test_slow_upload_counts_towards_limit(self):
+        """Запрос, который ещё присылает тело, уже занимает место."""
+        release = threading.Event()
+
+        def ok(environ, start_response):
+            start_response('200 OK', [])
+            return [b'ok']
+
+        async def receive():
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            pass
+
+        application = AsgiHandler(ok, threads=1, max_pending=0)
+        self.addCleanup(application.executor.shutdown)
+        upload = threading.Thread(target=lambda: asyncio.run(application(
+            {'type': 'http', 'method': 'POST', 'path': '/',
+             'query_string': b'', 'headers': []},
+            receive, send
+        )))
+        upload.start()
+        deadline = time.monotonic() + 5
+        while not application.in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        status, _, _ = asgi_request(application, '/')
+        release.set()
+        upload.join()
+        self.assertEqual(status, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertEqual(application.in_flight, 0)
+
+
+class CountingBackend(locmem.EmailBackend):
+    """locmem, который считает соединения и не принимает bounce@."""
+    connections = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        CountingBackend.connections += 1
+
+    def send_messages(self, messages):
+        if any('bounce@example.com' in m.to for m in messages):
+            raise smtplib.SMTPRecipientsRefused({})
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.tests.test_views.CountingBackend', JOBS_EAGER=False
+)
+class MailQueueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='writer', email='writer@example.com'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', first_name='Читатель',
+            email='reader@example.com', password='secret-pass'
+        )
+
+    def setUp(self):
+        cache.clear()
+        CountingBackend.connections = 0
+
+    def test_batch_uses_one_connection(self):
+        """Пачка писем — одно соединение; отказ не отправляет пачку снова."""
+        for address in ('a@example.com', 'bounce@example.com',
+                        'b@example.com'):
+            queue_mail('Тема', 'Текст', [address])
+        self.assertEqual(mail.outbox, [])
+        drain()
+        self.assertEqual(CountingBackend.connections, 1)
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [['a@example.com'], ['b@example.com']]
+        )
+        retry = Job.objects.get()
+        self.assertIn('"attempts":1', retry.payload)
+        self.assertGreater(retry.run_at, timezone.now())
+
+    @override_settings(EMAIL_RATE_LIMIT=2)
+    def test_rate_limit_defers(self):
+        for num in range(3):
+            queue_mail(f'Письмо {num}', 'Текст', ['a@example.com'])
+        queue_mail('Другому', 'Текст', ['b@example.com'])
+        drain()
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ['Письмо 0', 'Письмо 1', 'Другому']
+        )
+        deferred = Job.objects.get()
+        self.assertIn('Письмо 2', json.loads(deferred.payload)['subject'])
+        self.assertGreater(deferred.run_at, timezone.now())
+
+    def test_password_reset_is_queued(self):
+        """В очереди только id пользователя, ссылку строит воркер."""
+        response = self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'reader@example.com'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertEqual(mail.outbox, [])
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'users.send_password_reset')
+        self.assertEqual(json.loads(job.payload)['user_id'], self.reader.pk)
+        self.assertNotIn('/reset/', job.payload)
+        drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        link = re.search(
+            r'https?://[^/\s]+(/\S*reset/\S+)', mail.outbox[0].body
+        )
+        response = self.client.get(link.group(1))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertIn('set-password', response['Location'])
+
+    @override_settings(EMAIL_RATE_LIMIT=2)
+    def test_password_reset_rate_limit(self):
+        """Сбросы сверх лимита на адрес ждут следующего окна."""
+        for _ in range(3):
+            self.client.post(
+                reverse('users:password_reset_form'),
+                {'email': 'reader@example.com'}
+            )
+        drain()
+        self.assertEqual(len(mail.outbox), 2)
+        deferred = Job.objects.get()
+        self.assertEqual(deferred.name, 'users.send_password_reset')
+        self.assertGreater(deferred.run_at, timezone.now())
+        self.assertNotIn('/reset/', deferred.payload)
+
+    def test_follower_and_post_notifications(self):
+        self.client.force_login(self.reader)
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        Post.objects.create(text='Свежий пост', author=self.author)
+        drain()
+        letters = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(
+            set(letters), {'writer@example.com', 'reader@example.com'}
+        )
+        self.assertIn('Читатель', letters['writer@example.com'].body)
+        self.assertIn('Свежий пост', letters['reader@example.com'].body)
+        self.assertIn(
+            reverse('posts:post_detail', args=[
+                Post.objects.get(text='Свежий пост').pk
+            ]),
+            letters['reader@example.com'].body
+        )
+
+
+class RotatingFileBackendTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        cache.clear()
+
+    def test_batches_rotate_into_daily_archive(self):
+        archive = os.path.join(self.directory, 'archive')
+        os.makedirs(archive)
+        stale = os.path.join(archive, '2000-01-01.log.gz')
+        open(stale, 'wb').close()
+        with self.settings(
+            EMAIL_BACKEND='core.mail.RotatingFileBackend',
+            EMAIL_FILE_PATH=self.directory
+        ):
+            for batch in ('первая', 'вторая'):
+                queue_mail(f'Пачка {batch}', 'Текст', ['a@example.com'])
+                queue_mail(f'Пачка {batch}', 'Текст', ['b@example.com'])
+                drain()
+        self.assertEqual(os.listdir(self.directory), ['archive'])
+        today = f'{timezone.now().date().isoformat()}.log.gz'
+        self.assertEqual(os.listdir(archive), [today])
+        with gzip.open(os.path.join(archive, today), 'rt') as letters:
+            content = letters.read()
+        self.assertEqual(content.count('Subject:'), 4)
+        self.assertEqual(content.count('To: b@example.com'), 2)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Post, Group
+from .search import index_ready, matching
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +16,19 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Ищем по инвертированному индексу вместо LIKE '%слово%', все
+        совпадения без лимита выдачи сайта. Пока индекс не построен
+        (rebuild_search_index) — обычный поиск по search_fields.
+        """
+        found = matching(queryset, search_term)
+        if found is None or not index_ready():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return found, False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
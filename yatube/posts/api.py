@@ -0,0 +1,256 @@
+"""
+JSON API только для чтения: посты, группы, профили, комментарии
+и лента подписок.
+
+Берёт те же выборки, что и HTML-view, листает ленты курсором
+(CursorPaginator) и отдаёт только запрошенные поля:
+?fields=id,author,image загружает из базы лишь нужные колонки
+через QuerySet.only(), без text и остальных полей.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from .counters import user_counters
+from .following import is_following
+from .models import Comment, Group, Post, User
+from .timeline import timeline
+from .utils import CursorPaginator, paginate_comments
+
+
+def _image_url(post):
+    if post.thumbnail:
+        return default_storage.url(post.thumbnail)
+    if post.image:
+        return post.image.url
+    return None
+
+
+# Поле ответа: (колонки для only(), значение)
+POST_FIELDS = {
+    'id': (('id',), lambda post: post.pk),
+    'text': (('text',), lambda post: post.text),
+    'pub_date': (('pub_date',), lambda post: post.pub_date),
+    'author': (
+        ('author', 'author__username'), lambda post: post.author.username
+    ),
+    'group': (
+        ('group', 'group__slug'),
+        lambda post: post.group.slug if post.group_id else None
+    ),
+    'image': (('image', 'thumbnail'), _image_url),
+    'comments_count': (
+        ('comments_count',), lambda post: post.comments_count
+    ),
+}
+GROUP_FIELDS = {
+    'slug': (('slug',), lambda group: group.slug),
+    'title': (('title',), lambda group: group.title),
+    'description': (('description',), lambda group: group.description),
+    'posts_count': (('posts_count',), lambda group: group.posts_count),
+}
+COMMENT_FIELDS = {
+    'id': (('id',), lambda comment: comment.pk),
+    'author': (
+        ('author', 'author__username'),
+        lambda comment: comment.author.username
+    ),
+    'text': (('text',), lambda comment: comment.text),
+    'created': (('created',), lambda comment: comment.created),
+}
+# Курсор строится по (pub_date, id): эти колонки нужны всегда
+CURSOR_COLUMNS = ('id', 'pub_date')
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def api_response(data, status=200):
+    """Компактный JSON: без пробелов и без \\uXXXX для кириллицы."""
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False}
+    )
+
+
+def api_error(message, status):
+    return api_response({'error': message}, status=status)
+
+
+def api_view(view):
+    """GET/HEAD, ошибки полей — 400 в JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except FieldsError as error:
+            return api_error(str(error), 400)
+    return wrapper
+
+
+def api_login_required(view):
+    """Как login_required, но вместо редиректа на форму входа — 401."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return api_error('Требуется авторизация', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def requested_fields(request, schema):
+    """Поля из ?fields=a,b в порядке схемы; без параметра — все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(schema)
+    names = set(filter(None, (name.strip() for name in raw.split(','))))
+    unknown = names - set(schema)
+    if unknown:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}; '
+            f'доступны: {", ".join(schema)}'
+        )
+    return [name for name in schema if name in names]
+
+
+def sparse(queryset, schema, fields, always=()):
+    """
+    Загружает только колонки полей fields; связанные таблицы
+    присоединяются, лишь если их поля запрошены.
+    """
+    columns = set(always)
+    for name in fields:
+        columns.update(schema[name][0])
+    related = {column.split('__')[0] for column in columns if '__' in column}
+    return queryset.select_related(None).select_related(
+        *sorted(related)
+    ).only(*sorted(columns))
+
+
+def serialize(obj, schema, fields):
+    return {name: schema[name][1](obj) for name in fields}
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_PER_PAGE))
+    except ValueError:
+        limit = settings.POSTS_PER_PAGE
+    return max(1, min(limit, settings.API_MAX_LIMIT))
+
+
+def post_feed(request, posts):
+    """Страница ленты: {"results": [...], "next": ..., "previous": ...}."""
+    fields = requested_fields(request, POST_FIELDS)
+    page = CursorPaginator(
+        sparse(posts, POST_FIELDS, fields, always=CURSOR_COLUMNS),
+        _limit(request)
+    ).get_page(request.GET.get('cursor'))
+    return api_response({
+        'results': [serialize(post, POST_FIELDS, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@api_view
+def posts(request):
+    return post_feed(request, Post.objects.all())
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return post_feed(request, group.posts.all())
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return post_feed(request, author.posts.all())
+
+
+@api_view
+@api_login_required
+def follow_posts(request):
+    return post_feed(request, timeline(request.user))
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = requested_fields(request, POST_FIELDS)
+    post = get_object_or_404(
+        sparse(Post.objects.all(), POST_FIELDS, fields, always=('id',)),
+        pk=post_id
+    )
+    return api_response(serialize(post, POST_FIELDS, fields))
+
+
+@api_view
+def post_comments(request, post_id):
+    """Комментарии страницами ?comments_page=, как на странице поста."""
+    fields = requested_fields(request, COMMENT_FIELDS)
+    post = get_object_or_404(
+        Post.objects.only('comments_count'), pk=post_id
+    )
+    comments = paginate_comments(
+        request,
+        sparse(
+            Comment.objects.filter(post=post), COMMENT_FIELDS, fields
+        ).order_by('created', 'pk'),
+        count=post.comments_count
+    )
+    return api_response({
+        'results': [
+            serialize(comment, COMMENT_FIELDS, fields)
+            for comment in comments
+        ],
+        'count': comments.paginator.count,
+        'next': (
+            comments.next_page_number() if comments.has_next() else None
+        ),
+    })
+
+
+@api_view
+def groups(request):
+    fields = requested_fields(request, GROUP_FIELDS)
+    queryset = sparse(
+        Group.objects.order_by('title'), GROUP_FIELDS, fields,
+        always=('id',)
+    )
+    return api_response({
+        'results': [
+            serialize(group, GROUP_FIELDS, fields) for group in queryset
+        ],
+    })
+
+
+@api_view
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('counters').only(
+            'username', 'first_name', 'last_name',
+            'counters__posts_count', 'counters__followers_count',
+            'counters__following_count',
+        ),
+        username=username
+    )
+    counters = user_counters(author)
+    data = {
+        'username': author.username,
+        'name': author.get_full_name(),
+        'posts_count': counters.posts_count,
+        'followers_count': counters.followers_count,
+        'following_count': counters.following_count,
+    }
+    if request.user.is_authenticated:
+        data['following'] = is_following(request.user, author)
+    return api_response(data)
@@ -0,0 +1,186 @@
+import math
+import os
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.utils import make_template_fragment_key
+
+from core import db_router
+
+GENERATION_KEY = 'posts:generation'
+CHANGED_KEY = 'posts:changed'
+STATS_KEY = 'posts:cache-stats:{name}:{kind}'
+FRAGMENTS = ('index_page', 'group_page', 'profile_page')
+
+
+def generation():
+    """
+    Текущее поколение лент. Входит в версию ключей кэша, поэтому
+    после bump_generation() старые фрагменты просто перестают читаться.
+    """
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # Начинаем с метки времени: если ключ вытеснят из кэша,
+        # поколение не вернётся к уже использованному значению
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation()
+    cache.set(CHANGED_KEY, time.time(), None)
+
+
+def last_change():
+    """
+    Время (timestamp) последнего bump_generation(). Если ключ
+    вытеснен, считаем, что ленты изменились только что.
+    """
+    value = cache.get(CHANGED_KEY)
+    if value is None:
+        cache.add(CHANGED_KEY, time.time(), None)
+        value = cache.get(CHANGED_KEY)
+    return value
+
+
+def _record(name, kind):
+    key = STATS_KEY.format(name=name, kind=kind)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def cache_stats(names=FRAGMENTS):
+    """Счётчики попаданий и промахов: {name: {'hits': .., 'misses': ..}}."""
+    return {
+        name: {
+            kind: cache.get(STATS_KEY.format(name=name, kind=kind), 0)
+            for kind in ('hits', 'misses')
+        }
+        for name in names
+    }
+
+
+def _rebuild(key, build, timeout, version):
+    started = time.monotonic()
+    value = build()
+    delta = time.monotonic() - started
+    cache.set(
+        key, (value, time.time() + timeout, delta), timeout, version=version
+    )
+    return value
+
+
+def _lock_path(lock_key, version):
+    """Файл блокировки, если кэш файловый, иначе None."""
+    backend = caches['default']
+    if not isinstance(backend, FileBasedCache):
+        return None
+    return backend._key_to_file(lock_key, version) + '.lock'
+
+
+def _acquire(lock_key, version):
+    """
+    Берёт блокировку пересборки. cache.add() атомарен в locmem, db
+    и redis, но не в FileBasedCache: там проверка и запись файла —
+    разные шаги. Для него блокировка — файл, созданный с O_EXCL;
+    файл старше CACHE_LOCK_TIMEOUT (процесс упал) считается
+    свободным — к этому сроку ожидающие и так собирают значение сами.
+    """
+    path = _lock_path(lock_key, version)
+    if path is None:
+        return cache.add(
+            lock_key, 1, settings.CACHE_LOCK_TIMEOUT, version=version
+        )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age < settings.CACHE_LOCK_TIMEOUT:
+                return False
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def _release(lock_key, version):
+    path = _lock_path(lock_key, version)
+    if path is None:
+        cache.delete(lock_key, version=version)
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def single_flight(key, build, timeout, version=None):
+    """
+    cache.get_or_set с защитой от «стаи» одновременных пересборок.
+    Значение пересобирает только тот, кто взял блокировку (_acquire);
+    остальные ждут его результат либо отдают ещё живое старое значение.
+    Незадолго до истечения TTL значение с некоторой вероятностью
+    пересобирается заранее (probabilistic early expiration), тем чаще,
+    чем дольше длится сборка. Возвращает (значение, попадание ли это).
+    """
+    lock_key = f'{key}:lock'
+    cached = cache.get(key, version=version)
+    if cached is not None:
+        value, expires_at, delta = cached
+        early = (
+            time.time() - delta * settings.CACHE_EARLY_EXPIRATION_BETA
+            * math.log(random.random() or 1e-9)
+        )
+        if early < expires_at:
+            return value, True
+        if not _acquire(lock_key, version):
+            return value, True
+    elif not _acquire(lock_key, version):
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(settings.CACHE_LOCK_POLL)
+            cached = cache.get(key, version=version)
+            if cached is not None:
+                return cached[0], True
+        # Владелец блокировки не успел: собираем сами
+        return _rebuild(key, build, timeout, version), False
+    try:
+        return _rebuild(key, build, timeout, version), False
+    finally:
+        _release(lock_key, version)
+
+
+def cached_fragment(name, vary_on, render):
+    """
+    Возвращает фрагмент name из кэша или рендерит и кладёт его туда.
+    Запрос, читающий с реплики, кэш только читает: отстающая реплика
+    записала бы старые посты под новым поколением на весь
+    POSTS_CACHE_TIMEOUT.
+    """
+    key = make_template_fragment_key(f'posts:{name}', vary_on)
+    version = generation()
+    if db_router.reading_replica():
+        cached = cache.get(key, version=version)
+        hit = cached is not None
+        content = cached[0] if hit else render()
+    else:
+        content, hit = single_flight(
+            key, render, settings.POSTS_CACHE_TIMEOUT, version=version
+        )
+    _record(name, 'hits' if hit else 'misses')
+    return content
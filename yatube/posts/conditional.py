@@ -0,0 +1,111 @@
+"""
+Функции свежести для условных GET-запросов (ETag / Last-Modified).
+
+Считаются до вызова view и должны быть дешёвыми: поколение лент
+из кэша плюс не больше одного маленького запроса к базе. Если ETag
+совпал, Django отвечает 304 без рендеринга шаблона.
+
+Основной валидатор — ETag: при If-None-Match Django не смотрит
+на If-Modified-Since. Last-Modified точен до секунды, поэтому его
+отдаём, только когда секунда последнего изменения уже прошла.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db.models import Max
+
+from .cache import generation, last_change
+from .following import following_digest
+from .models import Post
+
+
+def _etag(request, *parts):
+    """
+    Хэш от поколения лент, пользователя, CSRF-куки (она попадает
+    в формы страницы) и строки запроса вместе с частями самой view.
+    """
+    key = '|'.join(str(part) for part in (
+        generation(),
+        request.user.pk or '',
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.GET.urlencode(),
+        *parts,
+    ))
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _last_modified(changed_at):
+    """
+    Время изменения, округлённое вверх до секунды, или None, пока
+    эта секунда не закончилась: иначе правка в ту же секунду не сдвинет
+    дату, и клиент с одним If-Modified-Since получит 304 на устаревшую
+    страницу.
+    """
+    rounded = changed_at.replace(microsecond=0) + timedelta(seconds=1)
+    if rounded > datetime.now(timezone.utc):
+        return None
+    return rounded
+
+
+def _feeds_changed_at(request):
+    """
+    Last-Modified только для анонимов: для них страница зависит лишь
+    от постов и групп. Страницы авторизованных различаем по ETag.
+    """
+    if request.user.is_authenticated:
+        return None
+    return datetime.fromtimestamp(last_change(), timezone.utc)
+
+
+def index_etag(request):
+    return _etag(request, 'index')
+
+
+def group_etag(request, slug):
+    return _etag(request, 'group', slug)
+
+
+def profile_etag(request, username):
+    return _etag(
+        request, 'profile', username, following_digest(request.user)
+    )
+
+
+def feed_last_modified(request, *args, **kwargs):
+    changed_at = _feeds_changed_at(request)
+    if changed_at is None:
+        return None
+    return _last_modified(changed_at)
+
+
+def _post_state(request, post_id):
+    """(число комментариев, id и время последнего) — один запрос на запрос."""
+    if not hasattr(request, '_post_state'):
+        posts = Post.objects.filter(pk=post_id).order_by()
+        request._post_state = posts.annotate(
+            last_comment=Max('comments__pk'),
+            last_commented=Max('comments__created'),
+        ).values_list(
+            'comments_count', 'last_comment', 'last_commented'
+        ).first()
+    return request._post_state
+
+
+def post_etag(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    comments_count, last_comment, _ = state
+    return _etag(request, 'post', post_id, comments_count, last_comment)
+
+
+def post_last_modified(request, post_id):
+    changed_at = _feeds_changed_at(request)
+    state = _post_state(request, post_id)
+    if changed_at is None or state is None:
+        return None
+    last_commented = state[2]
+    if last_commented is not None:
+        changed_at = max(changed_at, last_commented)
+    return _last_modified(changed_at)
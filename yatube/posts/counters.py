@@ -0,0 +1,93 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+
+def user_counters(user):
+    """Счётчики пользователя; строка создаётся при первом обращении."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        counters, _ = UserCounters.objects.get_or_create(user=user)
+        return counters
+
+
+def bump(model, pk, **deltas):
+    """
+    Атомарно сдвигает счётчики строки model:
+    bump(Group, 1, posts_count=1).
+    """
+    # Счётчики беззнаковые: не уводим рассинхронизированный счётчик ниже нуля
+    floors = {
+        f'{field}__gte': -delta
+        for field, delta in deltas.items() if delta < 0
+    }
+    return model.objects.filter(pk=pk, **floors).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def bump_user(user_id, **deltas):
+    if bump(UserCounters, user_id, **deltas):
+        return
+    # Строки ещё нет: уменьшать нечего. Для роста заводим нулевую строку
+    # и сдвигаем её тем же UPDATE с F(): если строку одновременно создал
+    # другой процесс, get_or_create перечитает её после IntegrityError,
+    # и ни один прирост не потеряется
+    growth = {field: delta for field, delta in deltas.items() if delta > 0}
+    if growth:
+        UserCounters.objects.get_or_create(user_id=user_id)
+        bump(UserCounters, user_id, **growth)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def recount_users(user_ids):
+    """Пересчитывает счётчики подписок пользователей user_ids."""
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=pk) for pk in user_ids],
+        ignore_conflicts=True
+    )
+    return UserCounters.objects.filter(user_id__in=user_ids).update(
+        followers_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+    )
+
+
+def recount_all():
+    """
+    Пересчитывает все счётчики одним UPDATE на таблицу.
+    Возвращает число обработанных строк по каждой модели.
+    """
+    missing = User.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=pk) for pk in missing],
+        ignore_conflicts=True
+    )
+    return {
+        'groups': Group.objects.update(
+            posts_count=_count(Post.objects, 'group')
+        ),
+        'posts': Post.objects.update(
+            comments_count=_count(Comment.objects, 'post')
+        ),
+        'users': UserCounters.objects.update(
+            posts_count=_count(Post.objects, 'author'),
+            followers_count=_count(Follow.objects, 'author'),
+            following_count=_count(Follow.objects, 'user'),
+        ),
+    }
@@ -0,0 +1,55 @@
+"""
+Кэш подписок пользователя: отсортированный массив id авторов.
+
+Массив грузится из кэша (или базы) один раз за запрос и запоминается
+на объекте пользователя; проверка подписки — бинарный поиск без
+запросов к базе. Сигналы Follow сбрасывают кэш подписчика.
+Кэш общий для всех запросов, поэтому заполняется только из default:
+отстающая реплика вернула бы подписки до последнего изменения.
+"""
+import zlib
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db_router import PRIMARY
+from .models import Follow
+
+FOLLOWING_KEY = 'posts:following:{user_id}'
+EMPTY = array('L')
+
+
+def following_ids(user):
+    """Отсортированный array('L') с id авторов, на которых подписан user."""
+    if not user.is_authenticated:
+        return EMPTY
+    ids = getattr(user, '_following_ids', None)
+    if ids is None:
+        key = FOLLOWING_KEY.format(user_id=user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            ids = array('L', Follow.objects.using(PRIMARY).filter(
+                user=user
+            ).order_by('author_id').values_list('author_id', flat=True))
+            cache.set(key, ids, settings.FOLLOWING_CACHE_TIMEOUT)
+        user._following_ids = ids
+    return ids
+
+
+def is_following(user, author):
+    """Подписан ли user на author (пользователь или его id)."""
+    author_id = getattr(author, 'pk', author)
+    ids = following_ids(user)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def following_digest(user):
+    """Короткий отпечаток набора подписок, например для ETag."""
+    return zlib.crc32(following_ids(user).tobytes())
+
+
+def invalidate(user_id):
+    cache.delete(FOLLOWING_KEY.format(user_id=user_id))
@@ -0,0 +1,122 @@
+"""
+Массовые подписки и отписки пачками, без сигналов на каждую строку.
+
+Работают с парами (user_id, author_id). После каждой пачки счётчики,
+ленты и кэш подписок синхронизируются так же, как это делают сигналы
+Follow для одиночных подписок, включая письма о новых подписчиках.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from . import following, tasks, timeline
+from .counters import recount_users
+from .models import Follow, User, UserCounters
+
+
+def _batches(edges, size):
+    iterator = iter(edges)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _clean(edges):
+    """Убирает повторы и подписки на самого себя, сохраняя порядок."""
+    seen = set()
+    for user_id, author_id in edges:
+        edge = (int(user_id), int(author_id))
+        if edge[0] != edge[1] and edge not in seen:
+            seen.add(edge)
+            yield edge
+
+
+def _existing(batch):
+    """{(user_id, author_id): pk} для уже существующих пар из batch."""
+    rows = Follow.objects.filter(
+        user_id__in={user_id for user_id, _ in batch},
+        author_id__in={author_id for _, author_id in batch},
+    ).values_list('user_id', 'author_id', 'pk')
+    wanted = set(batch)
+    return {
+        (user_id, author_id): pk
+        for user_id, author_id, pk in rows
+        if (user_id, author_id) in wanted
+    }
+
+
+def _sync(edges):
+    users = {user_id for user_id, _ in edges}
+    recount_users(users | {author_id for _, author_id in edges})
+    for user_id in users:
+        following.invalidate(user_id)
+
+
+def follow_many(edges, batch_size=None):
+    """
+    Создаёт подписки пачками bulk_create(ignore_conflicts=True)
+    и добавляет в ленты последние посты авторов. Письма авторам
+    о новых подписчиках ставятся в очередь одним INSERT на пачку.
+    Возвращает число новых подписок.
+    """
+    created = 0
+    batch_size = batch_size or settings.FOLLOW_BATCH_SIZE
+    for batch in _batches(_clean(edges), batch_size):
+        with transaction.atomic():
+            existing = _existing(batch)
+            new = [edge for edge in batch if edge not in existing]
+            Follow.objects.bulk_create(
+                [
+                    Follow(user_id=user_id, author_id=author_id)
+                    for user_id, author_id in new
+                ],
+                ignore_conflicts=True
+            )
+            timeline.backfill_many(new)
+            _sync(new)
+            if new and settings.NOTIFY_NEW_FOLLOWER:
+                tasks.notify_new_followers.delay_many(
+                    {'user_id': user_id, 'author_id': author_id}
+                    for user_id, author_id in new
+                )
+        created += len(new)
+    return created
+
+
+def unfollow_many(edges, batch_size=None):
+    """
+    Удаляет подписки пачками одним DELETE и убирает посты авторов
+    из лент. Возвращает число удалённых подписок.
+    """
+    deleted = 0
+    batch_size = batch_size or settings.FOLLOW_BATCH_SIZE
+    for batch in _batches(_clean(edges), batch_size):
+        with transaction.atomic():
+            existing = _existing(batch)
+            if not existing:
+                continue
+            authors = {author_id for _, author_id in existing}
+            prolific = set(
+                UserCounters.objects.filter(
+                    user_id__in=authors,
+                    followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+                ).values_list('user_id', flat=True)
+            )
+            # QuerySet.delete() послал бы сигнал на каждую строку;
+            # у Follow нет зависимых таблиц, каскад не нужен
+            Follow.objects.filter(pk__in=list(existing.values()))._raw_delete(
+                Follow.objects.db
+            )
+            timeline.trim_many(existing)
+            _sync(existing)
+            became_regular = UserCounters.objects.filter(
+                user_id__in=prolific,
+                followers_count__lte=settings.TIMELINE_FANOUT_LIMIT
+            ).values_list('user_id', flat=True)
+            for author in User.objects.filter(pk__in=list(became_regular)):
+                timeline.refill_followers(author)
+        deleted += len(existing)
+    return deleted
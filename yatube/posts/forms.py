@@ -1,12 +1,67 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
 
 from .models import Post, Comment
+from .uploads import OversizedUpload, prepare_image
+
+
+class BoundedImageField(forms.ImageField):
+    """
+    ImageField, который до полной проверки Pillow отсекает слишком
+    большие файлы и картинки по размеру из заголовка.
+    """
+
+    default_error_messages = {
+        'too_large': 'Файл больше %(limit)s.',
+        'too_many_pixels': (
+            'Картинка слишком большая: %(width)s×%(height)s пикселей.'
+        ),
+    }
+
+    def to_python(self, data):
+        if data in self.empty_values:
+            return super().to_python(data)
+        if isinstance(data, OversizedUpload):
+            raise forms.ValidationError(
+                self.error_messages['too_large'],
+                code='too_large',
+                params={
+                    'limit': filesizeformat(
+                        settings.POST_IMAGE_MAX_UPLOAD_SIZE
+                    )
+                },
+            )
+        try:
+            # Image.open ленивый: читает только заголовок
+            with Image.open(data) as image:
+                width, height = image.size
+        except Exception:
+            width = height = 0
+        data.seek(0)
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                self.error_messages['too_many_pixels'],
+                code='too_many_pixels',
+                params={'width': width, 'height': height},
+            )
+        return super().to_python(data)
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {'image': BoundedImageField}
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # При редактировании без нового файла здесь старый FieldFile
+        if isinstance(image, UploadedFile):
+            image = prepare_image(image)
+        return image
 
 
 class CommentForm(forms.ModelForm):
@@ -0,0 +1,122 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from core.jobs import enqueue
+from .cache import bump_generation
+from .models import Post
+
+# Порядок важен: браузер берёт первый <source>, который понимает
+FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
+
+def available_formats():
+    """
+    Форматы из POST_IMAGE_FORMATS, которые умеет сохранять Pillow,
+    в порядке FORMATS. JPEG нужен всегда: это основное превью.
+    """
+    Image.init()
+    wanted = set(settings.POST_IMAGE_FORMATS) | {'jpeg'}
+    return [
+        fmt for fmt, (pillow_format, _, _) in FORMATS.items()
+        if fmt in wanted and pillow_format in Image.SAVE
+    ]
+
+
+def variant_name(post_id, width, fmt):
+    return f'posts/thumbs/{post_id}_{width}w.{FORMATS[fmt][1]}'
+
+
+def thumbnail_name(post_id):
+    """Основное превью: JPEG самой большой ширины."""
+    return variant_name(post_id, max(settings.POST_IMAGE_WIDTHS), 'jpeg')
+
+
+def fit(image, width):
+    """
+    Вписывает картинку в рамку шириной width с пропорциями
+    POST_THUMBNAIL_SIZE, увеличивая маленькие.
+    """
+    box_width, box_height = settings.POST_THUMBNAIL_SIZE
+    height = width * box_height / box_width
+    scale = min(width / image.width, height / image.height)
+    size = (
+        max(1, round(image.width * scale)),
+        max(1, round(image.height * scale)),
+    )
+    return image.resize(size, Image.LANCZOS)
+
+
+def render_variants(source, formats):
+    """{(ширина, формат): байты} для всех POST_IMAGE_WIDTHS и formats."""
+    variants = {}
+    with Image.open(source) as image:
+        image = image.convert('RGB')
+        for width in settings.POST_IMAGE_WIDTHS:
+            resized = fit(image, width)
+            for fmt in formats:
+                output = BytesIO()
+                resized.save(
+                    output,
+                    FORMATS[fmt][0],
+                    quality=settings.POST_THUMBNAIL_QUALITY
+                )
+                variants[width, fmt] = output.getvalue()
+    return variants
+
+
+def _store(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def delete_variants(post_id, keep=()):
+    """Удаляет превью поста всех ширин и форматов, кроме имён из keep."""
+    for width in settings.POST_IMAGE_WIDTHS:
+        for fmt in FORMATS:
+            name = variant_name(post_id, width, fmt)
+            if name not in keep and default_storage.exists(name):
+                default_storage.delete(name)
+
+
+def make_thumbnail(post_id):
+    """
+    Создаёт превью поста всех ширин и форматов рядом с оригиналом
+    и записывает в пост имя основного превью и список форматов.
+    Превью прежней картинки, которые не перезаписаны новыми (формат
+    стал недоступен, картинку убрали), удаляются.
+    """
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None:
+        return
+    name, formats, stored = '', [], set()
+    if post.image:
+        formats = available_formats()
+        with post.image.open('rb') as source:
+            variants = render_variants(source, formats)
+        for (width, fmt), content in variants.items():
+            stored.add(_store(variant_name(post_id, width, fmt), content))
+        name = thumbnail_name(post_id)
+    delete_variants(post_id, keep=stored)
+    Post.objects.filter(pk=post_id).update(
+        thumbnail=name,
+        image_formats=','.join(formats)
+    )
+    # update() не шлёт сигналов: сбрасываем фрагменты и ETag лент сами
+    bump_generation()
+
+
+def schedule_thumbnail(post):
+    """
+    Ставит создание превью в очередь (задача posts.make_thumbnails):
+    view не ждёт декодирования и сжатия картинки.
+    """
+    enqueue('posts.make_thumbnails', post_id=post.pk)
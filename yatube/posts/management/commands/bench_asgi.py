@@ -0,0 +1,172 @@
+import asyncio
+import io
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+
+from core.asgi import AsgiHandler, build_environ, run_wsgi
+from posts.models import Follow, User
+from .bench_views import Command as BenchViewsCommand, percentile
+
+
+def _scope(url, cookie):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'cookie', cookie.encode())],
+    }
+
+
+class Command(BenchViewsCommand):
+    help = (
+        'Нагрузочный тест: одновременные клиенты против WSGI-пути '
+        '(поток сервера на запрос) и ASGI-адаптера (пул потоков) '
+        'при разных пределах параллельности. Всё в одном процессе '
+        'и под одним GIL: сравниваются очереди и накладные расходы, '
+        'а не сетевой ввод-вывод'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--clients', default='1,8,32',
+            help='Числа одновременных клиентов через запятую'
+        )
+        parser.add_argument(
+            '--threads', default='4,16',
+            help='Пределы параллельности (потоки сервера / пула)'
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            self.generate(options)
+            rows = self.compare(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        for row in rows:
+            self.stdout.write(
+                f'{row["path"]:<5} потоков {row["threads"]:>3}  '
+                f'клиентов {row["clients"]:>3}  '
+                f'{row["rps"]:7.1f} rps  p50 {row["p50_ms"]:7.1f} мс  '
+                f'p95 {row["p95_ms"]:7.1f} мс  '
+                f'ошибок {row["errors"]}'
+            )
+
+    def compare(self, options):
+        client = Client()
+        reader = Follow.objects.values_list('user', flat=True).first()
+        client.force_login(User.objects.get(pk=reader))
+        cookie = (
+            f'{settings.SESSION_COOKIE_NAME}='
+            f'{client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        )
+        targets = list(self.targets().values())
+        urls = [
+            random.choice(targets)() for _ in range(options['requests'])
+        ]
+        wsgi = WSGIHandler()
+        rows = []
+        for threads in map(int, options['threads'].split(',')):
+            for clients in map(int, options['clients'].split(',')):
+                for path, run in (
+                    ('wsgi', self.run_wsgi), ('asgi', self.run_asgi)
+                ):
+                    cache.clear()
+                    started = time.perf_counter()
+                    latencies, errors = run(
+                        wsgi, urls, cookie, threads, clients
+                    )
+                    elapsed = time.perf_counter() - started
+                    rows.append({
+                        'path': path,
+                        'threads': threads,
+                        'clients': clients,
+                        'rps': len(urls) / elapsed,
+                        'p50_ms': percentile(latencies, 0.50) * 1000,
+                        'p95_ms': percentile(latencies, 0.95) * 1000,
+                        'errors': errors,
+                    })
+        return rows
+
+    def run_wsgi(self, wsgi, urls, cookie, threads, clients):
+        """
+        Потоковый WSGI-сервер: clients соединений, но обрабатывают их
+        не больше threads потоков; остальные ждут в очереди.
+        """
+        workers = threading.BoundedSemaphore(threads)
+        queue = iter(urls)
+        lock = threading.Lock()
+        latencies, errors = [], []
+
+        def client():
+            while True:
+                with lock:
+                    url = next(queue, None)
+                if url is None:
+                    return
+                environ = build_environ(_scope(url, cookie), io.BytesIO())
+                started = time.perf_counter()
+                with workers:
+                    status, _, _ = run_wsgi(wsgi, environ)
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    if status != 200:
+                        errors.append(url)
+
+        pool = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return latencies, len(errors)
+
+    def run_asgi(self, wsgi, urls, cookie, threads, clients):
+        """clients корутин-клиентов к AsgiHandler с пулом threads."""
+        application = AsgiHandler(wsgi, threads=threads)
+        latencies, errors = [], []
+
+        async def request(url):
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request'}
+
+            async def send(message):
+                messages.append(message)
+
+            started = time.perf_counter()
+            await application(_scope(url, cookie), receive, send)
+            latencies.append(time.perf_counter() - started)
+            if messages[0]['status'] != 200:
+                errors.append(url)
+
+        async def client(queue):
+            for url in queue:
+                await request(url)
+
+        async def main():
+            queue = iter(urls)
+            await asyncio.gather(*(client(queue) for _ in range(clients)))
+
+        try:
+            asyncio.run(main())
+        finally:
+            application.executor.shutdown(wait=True)
+        return latencies, len(errors)
@@ -0,0 +1,151 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+from mixer.backend.django import mixer
+
+from posts.models import Group, Post, User
+from .bench_views import BATCH_SIZE, percentile
+
+# Журнал SQLite по умолчанию: писатель блокирует читателей
+SQLITE_DEFAULTS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность базы при одновременных чтениях '
+        'и записях постов; для SQLite сравнивает журнал по умолчанию '
+        'с профилем SQLITE_PRAGMAS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            modes = {
+                'sqlite по умолчанию': SQLITE_DEFAULTS,
+                'sqlite WAL + PRAGMA': settings.SQLITE_PRAGMAS,
+            }
+        else:
+            modes = {connection.vendor: None}
+        for label, pragmas in modes.items():
+            if pragmas is None:
+                row = self.run_mode(options)
+            else:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    row = self.run_mode(options)
+            self.stdout.write(
+                f'{label:<22} чтений {row["reads"]:8.1f}/с  '
+                f'записей {row["writes"]:7.1f}/с  '
+                f'p95 записи {row["write_p95_ms"]:7.1f} мс  '
+                f'ошибок блокировки {row["errors"]}'
+            )
+
+    def run_mode(self, options):
+        """Нагрузка на свежей тестовой базе; для SQLite — в файле."""
+        old_name = connection.settings_dict['NAME']
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        old_test_name = test_settings.get('NAME')
+        directory = None
+        if connection.vendor == 'sqlite':
+            # В памяти нет ни журнала, ни конкуренции за файл
+            directory = tempfile.mkdtemp()
+            test_settings['NAME'] = os.path.join(directory, 'bench.sqlite3')
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            self.generate(options)
+            connection.close()
+            return self.measure(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = old_test_name
+            if directory:
+                for name in os.listdir(directory):
+                    os.remove(os.path.join(directory, name))
+                os.rmdir(directory)
+
+    def generate(self, options):
+        self.users = mixer.cycle(20).blend(User)
+        self.groups = mixer.cycle(5).blend(Group)
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=f'пост {num}',
+                    author=random.choice(self.users),
+                    group=random.choice(self.groups),
+                )
+                for num in range(options['posts'])
+            ),
+            batch_size=BATCH_SIZE
+        )
+
+    def measure(self, options):
+        deadline = time.monotonic() + options['seconds']
+        stats = {'reads': 0, 'writes': 0, 'errors': 0}
+        write_latencies = []
+        lock = threading.Lock()
+
+        def read():
+            group = random.choice(self.groups)
+            list(
+                Post.objects.filter(group=group)
+                .select_related('author', 'group')[:10]
+            )
+
+        def write():
+            started = time.perf_counter()
+            Post.objects.create(
+                text='новый пост',
+                author=random.choice(self.users),
+                group=random.choice(self.groups),
+            )
+            with lock:
+                write_latencies.append(time.perf_counter() - started)
+
+        def worker(action, kind):
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        action()
+                    except OperationalError:
+                        kind_done = 'errors'
+                    else:
+                        kind_done = kind
+                    with lock:
+                        stats[kind_done] += 1
+            finally:
+                # У каждого потока своё соединение
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, args=(read, 'reads'))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=(write, 'writes'))
+            for _ in range(options['writers'])
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        return {
+            'reads': stats['reads'] / elapsed,
+            'writes': stats['writes'] / elapsed,
+            'errors': stats['errors'],
+            'write_p95_ms': (
+                percentile(write_latencies, 0.95) * 1000
+                if write_latencies else 0
+            ),
+        }
@@ -0,0 +1,197 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment
+)
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+
+from posts import timeline
+from posts.counters import recount_all
+from posts.models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 500
+MEMORY_SAMPLES = 10
+
+
+def percentile(values, share):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, int(round(share * len(ordered) + 0.5)) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет тестовую базу синтетическими данными и замеряет '
+        'задержку, число запросов и память страниц posts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько запросов делать к каждой странице'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--json', dest='json_path',
+            help='Куда сохранить результаты для сравнения коммитов'
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        Faker.seed(options['seed'])
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0)
+        try:
+            self.generate(options)
+            results = self.measure(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self.report(results, options)
+
+    def generate(self, options):
+        fake = Faker('ru_RU')
+        started = time.perf_counter()
+        users = mixer.cycle(options['users']).blend(User)
+        groups = mixer.cycle(options['groups']).blend(Group)
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=fake.text(),
+                    author=random.choice(users),
+                    group=random.choice(groups + [None]),
+                )
+                for _ in range(options['posts'])
+            ),
+            batch_size=BATCH_SIZE
+        )
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post_id=random.choice(post_ids),
+                    author=random.choice(users),
+                    text=fake.sentence(),
+                )
+                for _ in range(options['comments'])
+            ),
+            batch_size=BATCH_SIZE
+        )
+        edges = {
+            (random.choice(users), random.choice(users))
+            for _ in range(options['follows'])
+        }
+        Follow.objects.bulk_create(
+            (
+                Follow(user=user, author=author)
+                for user, author in edges if user != author
+            ),
+            batch_size=BATCH_SIZE
+        )
+        # bulk_create не шлёт сигналы: счётчики и ленты собираем явно
+        recount_all()
+        for follow in Follow.objects.select_related('user', 'author'):
+            timeline.backfill(follow.user, follow.author)
+        self.stdout.write(
+            f'Данные сгенерированы за {time.perf_counter() - started:.1f} с'
+        )
+
+    def targets(self):
+        users = list(User.objects.values_list('username', flat=True))
+        slugs = list(Group.objects.values_list('slug', flat=True))
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        return {
+            'index': lambda: reverse('posts:index'),
+            'group_posts': lambda: reverse(
+                'posts:group_list', args=[random.choice(slugs)]
+            ),
+            'profile': lambda: reverse(
+                'posts:profile', args=[random.choice(users)]
+            ),
+            'post_detail': lambda: reverse(
+                'posts:post_detail', args=[random.choice(post_ids)]
+            ),
+            'follow_index': lambda: reverse('posts:follow_index'),
+        }
+
+    def measure(self, options):
+        client = Client()
+        reader = Follow.objects.values_list('user', flat=True).first()
+        client.force_login(User.objects.get(pk=reader))
+        results = {}
+        for name, make_url in self.targets().items():
+            latencies, queries = [], []
+            cache.clear()
+            for _ in range(options['requests']):
+                if options['cold']:
+                    cache.clear()
+                url = make_url()
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    response = client.get(url, {'page': random.randint(1, 5)})
+                    latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{url}: {response.status_code}')
+                queries.append(len(context))
+            # tracemalloc замедляет запросы, поэтому память меряем отдельно
+            tracemalloc.start()
+            for _ in range(MEMORY_SAMPLES):
+                client.get(make_url())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = {
+                'requests': len(latencies),
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'rps': len(latencies) / sum(latencies),
+                'queries_avg': statistics.mean(queries),
+                'queries_max': max(queries),
+                'memory_peak_kb': peak / 1024,
+            }
+        return results
+
+    def report(self, results, options):
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<13} p50 {row["p50_ms"]:7.1f} мс  '
+                f'p95 {row["p95_ms"]:7.1f} мс  p99 {row["p99_ms"]:7.1f} мс  '
+                f'{row["rps"]:7.1f} rps  '
+                f'запросов {row["queries_avg"]:.1f} '
+                f'(max {row["queries_max"]})  '
+                f'память {row["memory_peak_kb"]:.0f} КБ'
+            )
+        if options['json_path']:
+            payload = {
+                'options': {
+                    key: options[key] for key in (
+                        'users', 'groups', 'posts', 'comments',
+                        'follows', 'requests', 'cold', 'seed'
+                    )
+                },
+                'results': results,
+            }
+            with open(options['json_path'], 'w') as output:
+                json.dump(payload, output, indent=2)
+            self.stdout.write(f'Результаты записаны в {options["json_path"]}')
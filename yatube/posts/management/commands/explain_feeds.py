@@ -0,0 +1,70 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.models import Comment, Post, User
+from posts.timeline import timeline
+
+# Шаги плана, которых в лентах быть не должно: сортировка
+# и полный просмотр таблицы
+SUSPICIOUS = {
+    'sqlite': re.compile(r'USE TEMP B-TREE|SCAN (TABLE )?posts_\w+$'),
+    'postgresql': re.compile(r'\bSort\b|Seq Scan on posts_'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает планы основных запросов лент (EXPLAIN) и отмечает '
+        'в них сортировки и полные просмотры таблиц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', type=int, default=1)
+        parser.add_argument('--author', type=int, default=1)
+        parser.add_argument('--post', type=int, default=1)
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой, если найдены подозрительные шаги'
+        )
+
+    def queries(self, options):
+        """Основной запрос каждой view в том виде, как его строит view."""
+        per_page = settings.POSTS_PER_PAGE
+        feed = Post.objects.select_related('author', 'group')
+        return {
+            'index': feed[:per_page],
+            'group_posts': feed.filter(group_id=options['group'])[:per_page],
+            'profile': feed.filter(author_id=options['author'])[:per_page],
+            'post_detail (comments)': Comment.objects.filter(
+                post_id=options['post']
+            ).select_related('author').order_by(
+                'created', 'pk'
+            )[:settings.COMMENTS_PER_PAGE],
+            'follow_index': timeline(
+                User(pk=options['author'])
+            ).select_related('author', 'group')[:per_page],
+        }
+
+    def handle(self, *args, **options):
+        suspicious = SUSPICIOUS.get(connection.vendor)
+        problems = []
+        for name, queryset in self.queries(options).items():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in plan.splitlines():
+                if suspicious and suspicious.search(line):
+                    problems.append(name)
+                    self.stdout.write(self.style.WARNING(f'{line}  <--'))
+                else:
+                    self.stdout.write(line)
+            self.stdout.write('')
+        if problems:
+            message = 'Сортировка или полный просмотр: ' + ', '.join(
+                sorted(set(problems))
+            )
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import make_thumbnail
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт превью для постов с картинкой, у которых его ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать превью и для постов, где оно уже есть'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnail='')
+        total = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            make_thumbnail(post_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Создано превью: {total}'))
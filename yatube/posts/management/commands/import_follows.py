@@ -0,0 +1,64 @@
+import csv
+import sys
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.follows import follow_many, unfollow_many
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует подписки из CSV со строками «подписчик,автор» '
+        '(имена пользователей) пачками bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV-файл, «-» — stdin')
+        parser.add_argument(
+            '--unfollow', action='store_true',
+            help='Удалить перечисленные подписки вместо создания'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.FOLLOW_BATCH_SIZE
+        )
+
+    def edges(self, rows, batch_size):
+        """Пары id по именам; имена ищутся одним запросом на пачку."""
+        self.unknown = 0
+        rows = iter(rows)
+        while True:
+            batch = [row for row in islice(rows, batch_size) if row]
+            if not batch:
+                return
+            if any(len(row) != 2 for row in batch):
+                raise CommandError('Ожидаются строки «подписчик,автор»')
+            ids = dict(
+                User.objects.filter(
+                    username__in={name for row in batch for name in row}
+                ).values_list('username', 'pk')
+            )
+            for user, author in batch:
+                if user in ids and author in ids:
+                    yield ids[user], ids[author]
+                else:
+                    self.unknown += 1
+
+    def handle(self, *args, **options):
+        apply = unfollow_many if options['unfollow'] else follow_many
+        if options['path'] == '-':
+            self.run(apply, csv.reader(sys.stdin), options)
+            return
+        with open(options['path'], newline='') as source:
+            self.run(apply, csv.reader(source), options)
+
+    def run(self, apply, rows, options):
+        batch_size = options['batch_size']
+        changed = apply(self.edges(rows, batch_size), batch_size=batch_size)
+        action = 'удалено' if options['unfollow'] else 'создано'
+        self.stdout.write(
+            f'Подписок {action}: {changed}, '
+            f'строк с неизвестными именами: {self.unknown}'
+        )
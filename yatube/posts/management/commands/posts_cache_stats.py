@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import cache_stats, generation
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша лент'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Поколение: {generation()}')
+        for name, stats in cache_stats().items():
+            total = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / total if total else 0
+            self.stdout.write(
+                f'{name}: попаданий {stats["hits"]}, '
+                f'промахов {stats["misses"]}, доля {ratio:.0%}'
+            )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок'
+
+    def handle(self, *args, **options):
+        for name, rows in recount_all().items():
+            self.stdout.write(f'{name}: пересчитано строк {rows}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_timelines(apps, schema_editor):
+    """
+    Раскладывает по лентам последние TIMELINE_BACKFILL постов авторов
+    для уже существующих подписок, как timeline.backfill(). Счётчиков
+    ещё нет, поэтому «популярных» авторов считаем по Follow.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    followers = {}
+    for user_id, author_id in Follow.objects.values_list('user', 'author'):
+        followers.setdefault(author_id, set()).add(user_id)
+    prolific = set(
+        Follow.objects.order_by()
+        .values('author')
+        .annotate(total=Count('pk'))
+        .filter(total__gt=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list('author', flat=True)
+    )
+    for author_id, user_ids in followers.items():
+        if author_id in prolific:
+            continue
+        posts = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)[:settings.TIMELINE_BACKFILL]
+        )
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id, post_id=post_id, author_id=author_id
+                )
+                for user_id in user_ids
+                for post_id in posts
+            ),
+            batch_size=settings.TIMELINE_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_auto_20261018_1200'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'author'], name='posts_timel_user_id_b036fb_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:43
+
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+WORD_RE = re.compile(r'\w+')
+POST_TEXT_WEIGHT = 2
+MAX_TERM_LENGTH = 64
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def create_fts_table(apps, schema_editor):
+    if fts5_available(schema_editor.connection):
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_search "
+            "USING fts5(text, comments, tokenize='unicode61')"
+        )
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TERM_LENGTH]
+        for word in WORD_RE.findall(text.lower())
+        if len(word) > 1
+    ]
+
+
+def index_posts(apps, schema_editor):
+    """Индексирует уже опубликованные посты, как search.rebuild()."""
+    if (
+        settings.SEARCH_BACKEND != 'python'
+        and fts5_available(schema_editor.connection)
+    ):
+        schema_editor.execute(
+            'INSERT INTO posts_search (rowid, text, comments) '
+            'SELECT post.id, post.text, COALESCE(('
+            "SELECT group_concat(comment.text, ' ') "
+            'FROM posts_comment AS comment WHERE comment.post_id = post.id'
+            "), '') FROM posts_post AS post"
+        )
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    terms = []
+    for post_id, text in Post.objects.values_list('pk', 'text').iterator():
+        weights = Counter()
+        for comment in Comment.objects.filter(
+            post_id=post_id
+        ).values_list('text', flat=True):
+            weights.update(tokenize(comment))
+        for term in tokenize(text):
+            weights[term] += POST_TEXT_WEIGHT
+        terms.extend(
+            SearchTerm(term=term, post_id=post_id, weight=weight)
+            for term, weight in weights.items()
+        )
+        if len(terms) >= 1000:
+            SearchTerm.objects.bulk_create(terms)
+            terms = []
+    SearchTerm.objects.bulk_create(terms)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(index_posts, migrations.RunPython.noop),
+    ]
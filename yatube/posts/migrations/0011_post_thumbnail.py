@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, help_text='Имя готового превью в хранилище; пусто, пока не создано', max_length=255, verbose_name='Превью'),
+        ),
+    ]
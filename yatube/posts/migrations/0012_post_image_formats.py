@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_formats',
+            field=models.CharField(blank=True, editable=False, help_text='Через запятую, например avif,webp,jpeg', max_length=32, verbose_name='Форматы превью'),
+        ),
+    ]
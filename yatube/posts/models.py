@@ -7,9 +7,22 @@ User = get_user_model()
 
 class Post(models.Model):
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Под каждую ленту: фильтр (если есть), затем порядок ordering,
+        # чтобы база читала индекс подряд без сортировки
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='post_feed_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'
+            ),
+        ]
 
     text = models.TextField(
         'Текст поста',
@@ -23,8 +36,7 @@ class Post(models.Model):
     )
     pub_date = models.DateTimeField(
         'Дата создания',
-        auto_now_add=True,
-        db_index=True
+        auto_now_add=True
     )
     group = models.ForeignKey(
         'Group',
@@ -40,6 +52,25 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail = models.CharField(
+        'Превью',
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text='Имя готового превью в хранилище; пусто, пока не создано'
+    )
+    image_formats = models.CharField(
+        'Форматы превью',
+        max_length=32,
+        blank=True,
+        editable=False,
+        help_text='Через запятую, например avif,webp,jpeg'
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.text[:15]
@@ -53,12 +84,24 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
 
 
 class Comment(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     post = models.ForeignKey(
         Post,
@@ -94,5 +137,104 @@ class Follow(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+        # (user, author) покрыт уникальным индексом, а подписчиков
+        # автора ищем по (author, user)
+        indexes = [
+            models.Index(fields=['author', 'user']),
+        ]
+
+    def __str__(self):
+        return f'{self.user} --> {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя, разложенный при публикации."""
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        # Лента читается по (user, -pub_date, -post) без сортировки,
+        # отписка чистит записи по (user, author)
+        indexes = [
+            models.Index(fields=['user', 'author']),
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_feed_idx'
+            ),
+        ]
+
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    # Копия Post.pub_date: по ней лента сортируется внутри индекса
+    pub_date = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.user} <-- {self.post_id}'
+
+
+class UserCounters(models.Model):
+    """Денормализованные счётчики пользователя."""
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='counters',
+        on_delete=models.CASCADE
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    def __str__(self):
+        return f'{self.user}: {self.posts_count}'
+
+
+class SearchTerm(models.Model):
+    """
+    Строка инвертированного индекса: слово встречается в посте
+    weight раз.
+    """
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term'
+            ),
+        ]
+
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        related_name='search_terms',
+        on_delete=models.CASCADE
+    )
+    weight = models.PositiveIntegerField(default=1)
+
     def __str__(self):
-        return f'{self.user} --> {self.author}'
\ No newline at end of file
+        return f'{self.term} -> {self.post_id}'
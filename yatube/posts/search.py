@@ -0,0 +1,178 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Comment, Post, SearchTerm
+
+FTS_TABLE = 'posts_search'
+WORD_RE = re.compile(r'\w+')
+# Слово из текста поста весит больше, чем из комментария
+POST_TEXT_WEIGHT = 2
+MAX_TERM_LENGTH = 64
+_backends = {}
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TERM_LENGTH]
+        for word in WORD_RE.findall(text.lower())
+        if len(word) > 1
+    ]
+
+
+def backend():
+    """'fts5', если в базе есть таблица SQLite FTS5, иначе 'python'."""
+    if settings.SEARCH_BACKEND != 'auto':
+        return settings.SEARCH_BACKEND
+    if connection.vendor != 'sqlite':
+        return 'python'
+    database = connection.settings_dict['NAME']
+    if database not in _backends:
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        _backends[database] = 'fts5' if FTS_TABLE in tables else 'python'
+    return _backends[database]
+
+
+def _comments_text(post_id):
+    return ' '.join(
+        Comment.objects.filter(post_id=post_id).values_list('text', flat=True)
+    )
+
+
+def index_post(post_id):
+    """Переиндексирует текст поста и его комментарии."""
+    text = Post.objects.filter(pk=post_id).values_list(
+        'text', flat=True
+    ).first()
+    if text is None:
+        return remove_post(post_id)
+    comments = _comments_text(post_id)
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text, comments) '
+                'VALUES (%s, %s, %s)',
+                [post_id, text, comments]
+            )
+        return
+    weights = Counter(tokenize(comments))
+    for term in tokenize(text):
+        weights[term] += POST_TEXT_WEIGHT
+    SearchTerm.objects.filter(post_id=post_id).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, post_id=post_id, weight=weight)
+        for term, weight in weights.items()
+    )
+
+
+def remove_post(post_id):
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+    SearchTerm.objects.filter(post_id=post_id).delete()
+
+
+def rebuild():
+    """Полная переиндексация; возвращает число постов."""
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    SearchTerm.objects.all().delete()
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    for post_id in post_ids:
+        index_post(post_id)
+    return len(post_ids)
+
+
+def _fts_match(terms):
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _fts_candidates(terms, limit):
+    match = _fts_match(terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({FTS_TABLE}, %s, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY 2 LIMIT %s',
+            [float(POST_TEXT_WEIGHT), match, limit]
+        )
+        # bm25 тем меньше, чем документ релевантнее
+        return {post_id: -rank for post_id, rank in cursor.fetchall()}
+
+
+def _python_matches(terms):
+    return (
+        SearchTerm.objects.filter(term__in=terms)
+        .values('post')
+        .annotate(matched=Count('term'))
+        .filter(matched=len(terms))
+    )
+
+
+def _python_candidates(terms, limit):
+    rows = _python_matches(terms).annotate(
+        score=Sum('weight')
+    ).order_by('-score')[:limit]
+    return {row['post']: row['score'] for row in rows}
+
+
+def index_ready():
+    """Индекс построен: в нём что-то есть или постов ещё нет."""
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM {FTS_TABLE} LIMIT 1')
+            if cursor.fetchone():
+                return True
+    elif SearchTerm.objects.exists():
+        return True
+    return not Post.objects.exists()
+
+
+def matching(queryset, query):
+    """
+    queryset постов, где есть все слова запроса, — без ранжирования
+    и без SEARCH_MAX_RESULTS, для админки. None, если в запросе
+    нет слов.
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return None
+    if backend() == 'fts5':
+        # Подзапрос, а не список id: совпадений может быть сколько угодно
+        return queryset.extra(
+            where=[
+                f'"{Post._meta.db_table}"."id" IN (SELECT rowid FROM '
+                f'{FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[_fts_match(terms)]
+        )
+    return queryset.filter(pk__in=_python_matches(terms).values('post'))
+
+
+def search(query):
+    """
+    id постов, где встречаются все слова запроса: сначала более
+    релевантные и свежие. Релевантность затухает вдвое за
+    SEARCH_RECENCY_DAYS дней возраста поста.
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return []
+    find = _fts_candidates if backend() == 'fts5' else _python_candidates
+    scores = find(terms, settings.SEARCH_MAX_RESULTS)
+    now = timezone.now()
+    dates = Post.objects.filter(pk__in=scores).values_list('pk', 'pub_date')
+    ranked = {}
+    for post_id, pub_date in dates:
+        age_days = (now - pub_date).total_seconds() / 86400
+        ranked[post_id] = scores[post_id] / (
+            1 + age_days / settings.SEARCH_RECENCY_DAYS
+        )
+    return sorted(ranked, key=lambda post_id: (-ranked[post_id], -post_id))
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from . import following, images, search, tasks, timeline
+from .cache import bump_generation
+from .counters import bump, bump_user
+from .models import Comment, Follow, Group, Post, UserCounters
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def feeds_changed(sender, **kwargs):
+    bump_generation()
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Запоминаем группу, чтобы при смене пересчитать обе. Если group
+    # отложена (only()/defer()), не читаем её: это лишний запрос на
+    # каждый пост; старое значение при необходимости достанет pre_save
+    if 'group_id' in instance.__dict__:
+        instance._initial_group_id = instance.group_id
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    if instance.pk and not hasattr(instance, '_initial_group_id'):
+        instance._initial_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        bump_user(instance.author_id, posts_count=1)
+        if instance.group_id:
+            bump(Group, instance.group_id, posts_count=1)
+        tasks.fan_out_posts.delay(post_id=instance.pk)
+        if settings.NOTIFY_NEW_POST:
+            tasks.notify_new_posts.delay(post_id=instance.pk)
+    elif instance.group_id != instance._initial_group_id:
+        if instance._initial_group_id:
+            bump(Group, instance._initial_group_id, posts_count=-1)
+        if instance.group_id:
+            bump(Group, instance.group_id, posts_count=1)
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_user(instance.author_id, posts_count=-1)
+    if instance.group_id:
+        bump(Group, instance.group_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        bump(Post, instance.post_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    bump(Post, instance.post_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        bump_user(instance.author_id, followers_count=1)
+        bump_user(instance.user_id, following_count=1)
+        following.invalidate(instance.user_id)
+        timeline.backfill(instance.user, instance.author)
+        if settings.NOTIFY_NEW_FOLLOWER:
+            tasks.notify_new_followers.delay(
+                user_id=instance.user_id, author_id=instance.author_id
+            )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    bump_user(instance.author_id, followers_count=-1)
+    bump_user(instance.user_id, following_count=-1)
+    following.invalidate(instance.user_id)
+    timeline.trim(instance.user, instance.author)
+    became_regular = UserCounters.objects.filter(
+        user_id=instance.author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+    if became_regular:
+        tasks.refill_followers.delay(author_id=instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def post_indexed(sender, instance, **kwargs):
+    tasks.index_posts.delay(post_id=instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindexed(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_thumbnails_deleted(sender, instance, **kwargs):
+    images.delete_variants(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_indexed(sender, instance, **kwargs):
+    tasks.index_posts.delay(post_id=instance.post_id)
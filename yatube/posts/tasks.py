@@ -0,0 +1,102 @@
+"""
+Фоновые задачи posts для очереди core.jobs. Все пакетные: воркер
+передаёт аргументы всех ожидающих запусков, и повторы одного поста
+схлопываются в одну обработку.
+"""
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from core.jobs import task
+from core.mail import queue_mails
+
+from . import images, search, timeline
+from .models import Follow, Post, User
+
+
+def _post_ids(payloads):
+    return sorted({payload['post_id'] for payload in payloads})
+
+
+@task(batch=True)
+def make_thumbnails(payloads):
+    for post_id in _post_ids(payloads):
+        images.make_thumbnail(post_id)
+
+
+@task(batch=True)
+def fan_out_posts(payloads):
+    timeline.fan_out_posts(_post_ids(payloads))
+
+
+@task(batch=True)
+def index_posts(payloads):
+    """Десять новых комментариев к посту — одна переиндексация."""
+    for post_id in _post_ids(payloads):
+        search.index_post(post_id)
+
+
+@task(batch=True)
+def refill_followers(payloads):
+    authors = User.objects.filter(
+        pk__in={payload['author_id'] for payload in payloads}
+    )
+    for author in authors:
+        # Пока задача ждала, автор мог снова стать популярным
+        if not timeline.is_prolific(author):
+            timeline.refill_followers(author)
+
+
+@task(batch=True)
+def notify_new_followers(payloads):
+    users = User.objects.in_bulk({
+        user_id
+        for payload in payloads
+        for user_id in (payload['user_id'], payload['author_id'])
+    })
+    messages = []
+    for payload in payloads:
+        follower = users.get(payload['user_id'])
+        author = users.get(payload['author_id'])
+        if follower is None or author is None or not author.email:
+            continue
+        messages.append({
+            'subject': 'Новый подписчик на Yatube',
+            'body': render_to_string('posts/mail/new_follower.txt', {
+                'author': author,
+                'follower': follower,
+                'site_url': settings.SITE_URL,
+            }),
+            'to': [author.email],
+            'from_email': settings.DEFAULT_FROM_EMAIL,
+        })
+    queue_mails(messages)
+
+
+@task(batch=True)
+def notify_new_posts(payloads):
+    """Письма подписчикам с адресом; по пачке писем на пост."""
+    posts = Post.objects.select_related('author').filter(
+        pk__in=_post_ids(payloads)
+    )
+    for post in posts:
+        readers = User.objects.filter(
+            pk__in=Follow.objects.filter(
+                author=post.author_id
+            ).values('user')
+        ).exclude(email='').only(
+            'username', 'first_name', 'last_name', 'email'
+        )
+        queue_mails(
+            {
+                'subject': f'Новый пост: {post.author.username}',
+                'body': render_to_string('posts/mail/new_post.txt', {
+                    'reader': reader,
+                    'author': post.author,
+                    'post': post,
+                    'site_url': settings.SITE_URL,
+                }),
+                'to': [reader.email],
+                'from_email': settings.DEFAULT_FROM_EMAIL,
+            }
+            for reader in readers.iterator()
+        )
@@ -0,0 +1,39 @@
+from django import template
+
+from posts.cache import cached_fragment
+
+register = template.Library()
+
+
+class PostsCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        return cached_fragment(
+            self.name.resolve(context),
+            [var.resolve(context) for var in self.vary_on],
+            lambda: self.nodelist.render(context)
+        )
+
+
+@register.tag('posts_cache')
+def do_posts_cache(parser, token):
+    """
+    Кэширует фрагмент ленты до следующего изменения постов или групп:
+    {% posts_cache 'index_page' page_obj %} ... {% endposts_cache %}
+    """
+    nodelist = parser.parse(('endposts_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 1 argument."
+        )
+    return PostsCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        [parser.compile_filter(var) for var in tokens[2:]],
+    )
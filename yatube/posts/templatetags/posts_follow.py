@@ -0,0 +1,11 @@
+from django import template
+
+from posts.following import is_following
+
+register = template.Library()
+
+
+@register.filter
+def follows(user, author):
+    """{% if user|follows:author %} — без запросов к базе."""
+    return is_following(user, author)
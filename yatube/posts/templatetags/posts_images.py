@@ -0,0 +1,35 @@
+from django import template
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from posts.images import FORMATS, variant_name
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail_url(name):
+    """URL превью в хранилище: MEDIA_URL + имя годится не для всех."""
+    return default_storage.url(name) if name else ''
+
+
+@register.filter
+def image_sources(post):
+    """
+    Источники для <picture>: [{'type': mime, 'srcset': '...'}],
+    современные форматы первыми, JPEG последним.
+    """
+    if not post.thumbnail or not post.image_formats:
+        return []
+    formats = post.image_formats.split(',')
+    return [
+        {
+            'type': mime,
+            'srcset': ', '.join(
+                f'{default_storage.url(variant_name(post.pk, width, fmt))} '
+                f'{width}w'
+                for width in settings.POST_IMAGE_WIDTHS
+            ),
+        }
+        for fmt, (_, _, mime) in FORMATS.items() if fmt in formats
+    ]
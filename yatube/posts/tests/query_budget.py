@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+
+# Сколько SQL-запросов может сделать страница в худшем случае:
+# авторизованный пользователь (сессия и пользователь — 2 запроса),
+# холодный кэш лент, полная страница постов с картинками.
+# Ленты с подсказкой числа объектов (HintedPaginator) платят ещё 2
+# запроса, если подсказка разошлась с таблицей или ?page= за концом
+# ленты: COUNT(*) и повторное чтение последней страницы
+QUERY_BUDGETS = {
+    # +1 на оценку размера таблицы (approximate_count) при холодном кэше
+    'posts:index': 5 + 2,
+    'posts:group_list': 4 + 2,
+    'posts:profile': 5 + 2,
+    # подсказка — comments_count поста
+    'posts:post_detail': 5 + 2,
+    # без подсказки: COUNT(*) делается всегда, лишних запросов нет
+    'posts:follow_index': 5,
+}
+
+
+@contextmanager
+def query_budget(limit, label='block'):
+    """Падает, если внутри блока выполнено больше limit запросов."""
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    executed = len(context)
+    if executed > limit:
+        queries = '\n'.join(
+            f'{num}. {query["sql"]}'
+            for num, query in enumerate(context.captured_queries, start=1)
+        )
+        raise AssertionError(
+            f'{label}: {executed} запросов при бюджете {limit}:\n{queries}'
+        )
+
+
+def within_budget(limit):
+    """Декоратор для теста: query_budget на всё тело."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(limit, func.__qualname__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class BudgetClient(Client):
+    """Тестовый клиент, проверяющий QUERY_BUDGETS для каждого запроса."""
+
+    def request(self, **request):
+        try:
+            match = resolve(request['PATH_INFO'])
+        except Resolver404:
+            return super().request(**request)
+        budget = QUERY_BUDGETS.get(match.view_name)
+        if budget is None:
+            return super().request(**request)
+        with query_budget(budget, f'{match.view_name} {request["PATH_INFO"]}'):
+            return super().request(**request)
@@ -1,5 +1,7 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
@@ -7,6 +9,8 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from http import HTTPStatus
 
+from PIL import Image
+from posts.images import make_thumbnail, thumbnail_name, variant_name
 from posts.models import Group, Post, Comment
 
 User = get_user_model()
@@ -108,6 +112,113 @@ class PostFormTests(TestCase):
             0
         )
 
+    def test_make_thumbnail(self):
+        """Превью создаётся под предсказуемым именем и пишется в пост."""
+        post = Post.objects.create(
+            author=PostFormTests.user,
+            text='test-post',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=PostFormTests.small_gif,
+                content_type='image/gif'
+            )
+        )
+        make_thumbnail(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail, thumbnail_name(post.pk))
+        with Image.open(os.path.join(TEMP_MEDIA_ROOT, post.thumbnail)) as im:
+            self.assertEqual(im.size, (678, 339))
+        self.assertIn('jpeg', post.image_formats.split(','))
+        for fmt in post.image_formats.split(','):
+            for width in settings.POST_IMAGE_WIDTHS:
+                with self.subTest(fmt=fmt, width=width):
+                    self.assertTrue(os.path.exists(os.path.join(
+                        TEMP_MEDIA_ROOT, variant_name(post.pk, width, fmt)
+                    )))
+        response = self.guest.get(reverse('posts:index'))
+        self.assertContains(response, post.thumbnail)
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, f'{post.pk}_320w.jpg 320w')
+
+    def test_old_thumbnails_removed(self):
+        """Превью удаляются вместе с картинкой и вместе с постом."""
+        post = Post.objects.create(
+            author=PostFormTests.user,
+            text='test-post',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=PostFormTests.small_gif,
+                content_type='image/gif'
+            )
+        )
+        make_thumbnail(post.pk)
+        thumbnail = os.path.join(TEMP_MEDIA_ROOT, thumbnail_name(post.pk))
+        self.assertTrue(os.path.exists(thumbnail))
+        Post.objects.filter(pk=post.pk).update(image='')
+        make_thumbnail(post.pk)
+        self.assertFalse(os.path.exists(thumbnail))
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail, '')
+        post.image = self.make_jpeg((50, 50))
+        post.save()
+        make_thumbnail(post.pk)
+        self.assertTrue(os.path.exists(thumbnail))
+        post_id = post.pk
+        post.delete()
+        for fmt in ('avif', 'webp', 'jpeg'):
+            for width in settings.POST_IMAGE_WIDTHS:
+                with self.subTest(fmt=fmt, width=width):
+                    self.assertFalse(os.path.exists(os.path.join(
+                        TEMP_MEDIA_ROOT, variant_name(post_id, width, fmt)
+                    )))
+
+    def make_jpeg(self, size, exif=None):
+        output = BytesIO()
+        image = Image.new('RGB', size, 'red')
+        image.save(output, 'JPEG', exif=exif or Image.Exif())
+        return SimpleUploadedFile(
+            'photo.jpg', output.getvalue(), content_type='image/jpeg'
+        )
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_oversized_upload_rejected(self):
+        """Файл больше лимита не сохраняется, форма показывает ошибку."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'big', 'image': self.make_jpeg((50, 50))},
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 10\xa0байт.'
+        )
+        self.assertFalse(Post.objects.filter(text='big').exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_decompression_bomb_rejected(self):
+        """Картинка с большим числом пикселей отсекается по заголовку."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'bomb', 'image': self.make_jpeg((50, 50))},
+        )
+        self.assertEqual(
+            response.context['form'].errors['image'][0],
+            'Картинка слишком большая: 50×50 пикселей.'
+        )
+        self.assertFalse(Post.objects.filter(text='bomb').exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_large_image_downscaled_without_exif(self):
+        """Большой оригинал уменьшается, а EXIF из него вырезается."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'photo', 'image': self.make_jpeg((300, 200), exif)},
+        )
+        post = Post.objects.get(text='photo')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 67))
+            self.assertFalse(image.getexif())
+
     def test_unauth_user_cant_publish_post(self):
         """Неавт. польз. не может сделать пост"""
         response = self.guest.get(
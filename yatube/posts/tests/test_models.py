@@ -1,6 +1,19 @@
+import json
+import tempfile
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from posts.models import Group, Post
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from posts import counters
+from posts.follows import follow_many, unfollow_many
+from core.models import Job
+from posts.following import is_following
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, UserCounters
+)
 
 
 User = get_user_model()
@@ -30,3 +43,208 @@ class PostModelTest(TestCase):
         for general, subgeneral in instances:
             with self.subTest():
                 self.assertEqual(str(general), subgeneral)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counted')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='counted-group',
+            description='Описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-group',
+            description='Описание',
+        )
+
+    def refresh(self, *objects):
+        for obj in objects:
+            obj.refresh_from_db()
+
+    def test_signals_keep_counters_in_sync(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(
+            author=self.user, text='пост', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='комм')
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.refresh(post, self.group)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        counters = UserCounters.objects.get(user=self.user)
+        self.assertEqual(counters.posts_count, 1)
+        self.assertEqual(counters.followers_count, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.reader).following_count, 1
+        )
+
+        post.group = self.other_group
+        post.save()
+        self.refresh(self.group, self.other_group)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        post.delete()
+        self.refresh(self.other_group)
+        self.assertEqual(self.other_group.posts_count, 0)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.user).posts_count, 0
+        )
+
+    def test_bump_user_keeps_concurrent_increment(self):
+        """Строку счётчиков создал другой процесс — прирост не теряется."""
+        UserCounters.objects.filter(user=self.user).delete()
+        original = counters.bump
+
+        def racing_bump(model, pk, **deltas):
+            # Между нашим UPDATE и созданием строки её создал соседний
+            # процесс со своим приростом
+            if not UserCounters.objects.filter(user_id=pk).exists():
+                UserCounters.objects.create(user_id=pk, posts_count=5)
+                return 0
+            return original(model, pk, **deltas)
+
+        counters.bump = racing_bump
+        try:
+            counters.bump_user(self.user.pk, posts_count=1)
+        finally:
+            counters.bump = original
+        self.assertEqual(
+            UserCounters.objects.get(user=self.user).posts_count, 6
+        )
+        UserCounters.objects.filter(user=self.user).delete()
+        counters.bump_user(self.user.pk, posts_count=1, followers_count=-1)
+        counters.bump_user(self.user.pk, followers_count=-1)
+        row = UserCounters.objects.get(user=self.user)
+        self.assertEqual((row.posts_count, row.followers_count), (1, 0))
+
+    def test_recount_command_repairs_counters(self):
+        """recount_counters восстанавливает счётчики после bulk_create."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'пост {i}', group=self.group)
+            for i in range(3)
+        )
+        call_command('recount_counters', stdout=StringIO())
+        self.refresh(self.group)
+        self.assertEqual(self.group.posts_count, 3)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.user).posts_count, 3
+        )
+        self.assertEqual(
+            UserCounters.objects.get(user=self.reader).posts_count, 0
+        )
+
+
+class FollowBulkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='bulk-author')
+        cls.readers = [
+            User.objects.create_user(username=f'bulk-reader{num}')
+            for num in range(3)
+        ]
+        cls.post = Post.objects.create(author=cls.author, text='пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора запрещена в базе."""
+        Follow.objects.create(user=self.readers[0], author=self.author)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Follow.objects.create(user=self.readers[0], author=self.author)
+
+    def test_follow_and_unfollow_many(self):
+        """Пачки синхронизируют счётчики, ленты и кэш подписок."""
+        Follow.objects.create(user=self.readers[0], author=self.author)
+        self.assertFalse(is_following(self.readers[1], self.author))
+        edges = [(reader.pk, self.author.pk) for reader in self.readers]
+        edges += [(self.author.pk, self.author.pk), edges[1]]
+        self.assertEqual(follow_many(edges, batch_size=2), 2)
+        self.assertEqual(Follow.objects.count(), 3)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).followers_count, 3
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=self.post).count(), 3
+        )
+        reader = User.objects.get(pk=self.readers[1].pk)
+        self.assertTrue(is_following(reader, self.author))
+
+        self.assertEqual(unfollow_many(edges[:2]), 2)
+        self.assertEqual(
+            list(Follow.objects.values_list('user', flat=True)),
+            [self.readers[2].pk]
+        )
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(
+            UserCounters.objects.get(user=self.readers[0]).following_count, 0
+        )
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', flat=True)),
+            [self.readers[2].pk]
+        )
+
+    @override_settings(JOBS_EAGER=False)
+    def test_follow_many_notifies_authors(self):
+        """Новые подписки пачкой ставят письма авторам в очередь."""
+        Follow.objects.create(user=self.readers[0], author=self.author)
+        Job.objects.all().delete()
+        edges = [(reader.pk, self.author.pk) for reader in self.readers]
+        follow_many(edges)
+        self.assertEqual(
+            sorted(
+                json.loads(payload)['user_id']
+                for payload in Job.objects.filter(
+                    name='posts.notify_new_followers'
+                ).values_list('payload', flat=True)
+            ),
+            [self.readers[1].pk, self.readers[2].pk]
+        )
+        with override_settings(NOTIFY_NEW_FOLLOWER=False):
+            unfollow_many(edges)
+            follow_many(edges)
+        self.assertEqual(
+            Job.objects.filter(name='posts.notify_new_followers').count(),
+            2
+        )
+
+    def test_import_follows_command(self):
+        """import_follows читает пары имён из CSV."""
+        rows = [f'{reader.username},{self.author.username}'
+                for reader in self.readers]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as source:
+            source.write('\n'.join(rows + ['ghost,bulk-author']))
+            source.flush()
+            out = StringIO()
+            call_command('import_follows', source.name, stdout=out)
+            self.assertIn('создано: 3', out.getvalue())
+            self.assertIn('неизвестными именами: 1', out.getvalue())
+            call_command(
+                'import_follows', source.name, '--unfollow', stdout=out
+            )
+        self.assertFalse(Follow.objects.exists())
+
+
+class FeedIndexesTest(TestCase):
+    def test_feeds_read_indexes_without_sort(self):
+        """Ленты постов и комментарии читаются по индексам, без сортировки."""
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        plans = out.getvalue().split('\n\n')
+        for name in (
+            'index', 'group_posts', 'profile', 'post_detail', 'follow_index'
+        ):
+            with self.subTest(name=name):
+                plan = next(plan for plan in plans if plan.startswith(name))
+                self.assertIn('_idx', plan)
+                self.assertNotIn('<--', plan)
@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.test import TestCase
 from posts.models import Post, Group
 from http import HTTPStatus
 
+from .query_budget import BudgetClient
+
 User = get_user_model()
 
 
@@ -25,12 +27,12 @@ class ContactURLTests(TestCase):
 
     def setUp(self):
         """Пользователь"""
-        self.guest = Client()
+        self.guest = BudgetClient()
         """Авторизированный пользователь"""
-        self.authorized_user = Client()
+        self.authorized_user = BudgetClient()
         self.authorized_user.force_login(ContactURLTests.user)
         """Автор"""
-        self.user_author = Client()
+        self.user_author = BudgetClient()
         self.user_author.force_login(ContactURLTests.post.author)
 
     def test_index_url(self):
@@ -1,13 +1,28 @@
+import json
+import os
 import shutil
 import tempfile
+import threading
+import time
 from http import HTTPStatus
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase, Client, override_settings
-from posts.models import Post, Group, Follow
+from django.test import TestCase, override_settings
+from core import db_router
+from core.jobs import drain
+from posts.models import Comment, Post, Group, Follow, TimelineEntry
 from django.urls import reverse
+from ..cache import (
+    CHANGED_KEY, _acquire, _lock_path, _release, cache_stats,
+    cached_fragment, single_flight
+)
+from ..counters import recount_all
+from ..following import is_following
 from ..forms import PostForm
+from ..search import remove_post
+from ..utils import approximate_count, page_window
+from .query_budget import BudgetClient, query_budget
 from django.core.cache import cache
 
 User = get_user_model()
@@ -54,12 +69,12 @@ class PostViewTests(TestCase):
 
     def setUp(self):
         """Пользователь"""
-        self.guest = Client()
+        self.guest = BudgetClient()
         """Авторизированный пользователь"""
-        self.authorized_user = Client()
+        self.authorized_user = BudgetClient()
         self.authorized_user.force_login(PostViewTests.user)
         """Автор"""
-        self.user_author = Client()
+        self.user_author = BudgetClient()
         self.user_author.force_login(PostViewTests.post.author)
         """Чистим кэш"""
         cache.clear()
@@ -241,7 +256,7 @@ class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        cls.guest = Client()
+        cls.guest = BudgetClient()
         cls.user = User.objects.create_user(username='test')
         cls.group = Group.objects.create(
             title='Тестовое название',
@@ -257,6 +272,10 @@ class PaginatorViewsTest(TestCase):
             )
             for num in range(1, 14)
         ]
+        # Строки счётчиков заводим до bulk_create: он не шлёт сигналов,
+        # счётчики группы и автора остаются нулевыми, и паджинация
+        # не должна на них полагаться
+        recount_all()
         Post.objects.bulk_create(cls.posts)
 
     def test_index_paginator(self):
@@ -289,13 +308,129 @@ class PaginatorViewsTest(TestCase):
         )
         self.assertEqual(len(response.context['page_obj']), 10)
 
+    def test_stale_counters_do_not_hide_posts(self):
+        """Разошедшиеся счётчики не прячут посты и не дают пустых страниц."""
+        group_url = reverse(
+            'posts:group_list', kwargs={'slug': PaginatorViewsTest.group.slug}
+        )
+        profile_url = reverse(
+            'posts:profile',
+            kwargs={'username': PaginatorViewsTest.user.username}
+        )
+        for url in (group_url, profile_url):
+            with self.subTest(url=url):
+                page = self.guest.get(url, {'page': 2}).context['page_obj']
+                self.assertEqual(len(page), 3)
+                self.assertEqual(page.paginator.num_pages, 2)
+        Group.objects.update(posts_count=100)
+        page = self.guest.get(group_url, {'page': 7}).context['page_obj']
+        self.assertEqual((page.number, len(page)), (2, 3))
+        self.assertFalse(page.has_next())
+
+    def test_worst_case_pages_within_budget(self):
+        """Страница за подсказкой и за концом ленты укладываются в бюджет."""
+        client = BudgetClient()
+        client.force_login(PaginatorViewsTest.user)
+        urls = (
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': PaginatorViewsTest.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': PaginatorViewsTest.user.username}
+            ),
+        )
+        for url in urls:
+            for page in (2, 99):
+                with self.subTest(url=url, page=page):
+                    cache.clear()
+                    response = client.get(url, {'page': page})
+                    self.assertEqual(len(response.context['page_obj']), 3)
+        Group.objects.update(posts_count=100)
+        cache.clear()
+        response = client.get(urls[0], {'page': 7})
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_page_window(self):
+        """Навигация показывает края и окно вокруг текущей страницы."""
+        self.assertEqual(
+            page_window(50, 100, 2, 1),
+            [1, None, 48, 49, 50, 51, 52, None, 100]
+        )
+        self.assertEqual(page_window(1, 1, 2, 1), [1])
+        self.assertEqual(page_window(3, 7, 1, 1), [1, 2, 3, 4, None, 7])
+        self.assertEqual(page_window(2, 10, 2, 2), [1, 2, 3, 4, None, 9, 10])
+
+    @override_settings(POSTS_PER_PAGE=1, PAGINATOR_ON_EACH_SIDE=1)
+    def test_index_page_window_links(self):
+        """Ссылок на страницы не больше окна, а не по одной на каждую."""
+        response = self.guest.get(reverse('posts:index'), {'page': 7})
+        self.assertEqual(
+            response.context['page_obj'].page_window,
+            [1, None, 6, 7, 8, None, 13]
+        )
+        self.assertContains(response, '&hellip;', count=2)
+        self.assertNotContains(response, '?page=3"')
+
+    @override_settings(POSTS_APPROXIMATE_COUNT_MIN=1)
+    def test_index_approximate_count(self):
+        """Для больших таблиц число постов оценивается по max(id)."""
+        cache.clear()
+        Post.objects.filter(text='text 1').delete()
+        response = self.guest.get(reverse('posts:index'))
+        self.assertEqual(
+            response.context['page_obj'].paginator.count,
+            Post.objects.order_by('-pk').first().pk
+        )
+        self.assertEqual(approximate_count(Post), 13)
+        with override_settings(POSTS_COUNT_MODE='exact'):
+            self.assertIsNone(approximate_count(Post))
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_index_cursor_paginator(self):
+        """Курсорная паджинация index: вперёд и обратно."""
+        response = self.guest.get(reverse('posts:index'))
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+
+        response = self.guest.get(
+            reverse('posts:index') + f'?cursor={first_page.next_cursor}'
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            {post.pk for post in first_page}
+            & {post.pk for post in second_page},
+            set()
+        )
+
+        response = self.guest.get(
+            reverse('posts:index')
+            + f'?cursor={second_page.previous_cursor}'
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in first_page]
+        )
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.guest.get(reverse('posts:index') + '?cursor=%%%')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
 
 class CacheViewTest(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
         cls.author = User.objects.create_user(username='test-user')
-        cls.authorized_client = Client()
+        cls.authorized_client = BudgetClient()
         cls.authorized_client.force_login(cls.author)
         cls.group = Group.objects.create(
             title='test-group',
@@ -308,13 +443,16 @@ class CacheViewTest(TestCase):
             author=cls.author
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_cache_index(self):
-        """Проверка хранения и очищения кэша для index."""
+        """Проверка хранения и сброса кэша index при изменении постов."""
         response = CacheViewTest.authorized_client.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text='test-new-post',
-            author=CacheViewTest.author,
+        # update() не шлёт сигналы: поколение кэша не меняется
+        Post.objects.filter(pk=CacheViewTest.post.pk).update(
+            text='test-changed-post'
         )
         response_old = CacheViewTest.authorized_client.get(
             reverse('posts:index')
@@ -325,9 +463,536 @@ class CacheViewTest(TestCase):
             posts,
             'Не возвращает кэшированную страницу.'
         )
-        cache.clear()
+        Post.objects.create(
+            text='test-new-post',
+            author=CacheViewTest.author,
+        )
         response_new = CacheViewTest.authorized_client.get(
             reverse('posts:index')
         )
         new_posts = response_new.content
         self.assertNotEqual(old_posts, new_posts, 'Нет сброса кэша.')
+        self.assertIn(b'test-new-post', new_posts)
+
+    def test_cache_stats(self):
+        """Попадания и промахи кэша лент подсчитываются."""
+        url = reverse(
+            'posts:group_list', kwargs={'slug': CacheViewTest.group.slug}
+        )
+        CacheViewTest.authorized_client.get(url)
+        CacheViewTest.authorized_client.get(url)
+        self.assertEqual(
+            cache_stats()['group_page'], {'hits': 1, 'misses': 1}
+        )
+
+    def test_replica_reads_do_not_fill_fragments(self):
+        """Запрос с реплики читает фрагменты, но не записывает их."""
+        cache.clear()
+        self.addCleanup(db_router.reset)
+        # Сама реплика не важна: роутер лишь помечает запрос
+        db_router.use_replica(db_router.PRIMARY)
+        self.assertEqual(
+            cached_fragment('index_page', [1], lambda: 'реплика'), 'реплика'
+        )
+        db_router.reset()
+        self.assertEqual(
+            cached_fragment('index_page', [1], lambda: 'основная'),
+            'основная'
+        )
+        db_router.use_replica(db_router.PRIMARY)
+        self.assertEqual(
+            cached_fragment('index_page', [1], lambda: 'реплика'),
+            'основная'
+        )
+        self.assertEqual(
+            cache_stats()['index_page'], {'hits': 1, 'misses': 2}
+        )
+
+    def test_single_flight_builds_once(self):
+        """Одновременные промахи по одному ключу собирают значение один раз."""
+        self.check_single_flight()
+
+    def test_single_flight_file_cache(self):
+        """В файловом кэше блокировка — файл, созданный атомарно."""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }}):
+            self.check_single_flight()
+            self.assertTrue(_acquire('test-lock', None))
+            self.assertFalse(_acquire('test-lock', None))
+            # Блокировку упавшего процесса забирают после таймаута
+            stale = time.time() - settings.CACHE_LOCK_TIMEOUT - 1
+            os.utime(_lock_path('test-lock', None), (stale, stale))
+            self.assertTrue(_acquire('test-lock', None))
+            _release('test-lock', None)
+            self.assertTrue(_acquire('test-lock', None))
+
+    def check_single_flight(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            return 'fragment'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    single_flight('test-key', build, 60)[0]
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, ['fragment'] * 5)
+
+
+class FollowTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.old_post = Post.objects.create(
+            text='старый пост',
+            author=cls.author
+        )
+
+    def setUp(self):
+        self.reader_client = BudgetClient()
+        self.reader_client.force_login(FollowTimelineTest.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def follow(self):
+        self.reader_client.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': FollowTimelineTest.author.username}
+            )
+        )
+
+    @override_settings(JOBS_EAGER=False)
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """После подписки в ленте старые и новые посты автора."""
+        self.follow()
+        self.assertEqual(self.feed(), ['старый пост'])
+        Post.objects.create(text='новый пост', author=self.author)
+        # Раскладку по лентам делает фоновая задача
+        self.assertEqual(self.feed(), ['старый пост'])
+        drain()
+        self.assertEqual(self.feed(), ['новый пост', 'старый пост'])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+
+    def test_unfollow_trims_timeline(self):
+        """После отписки посты автора пропадают из ленты."""
+        self.follow()
+        self.reader_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': FollowTimelineTest.author.username}
+            )
+        )
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_prolific_author_read_on_demand(self):
+        """Посты популярного автора читаются из Post без раскладки."""
+        self.follow()
+        Post.objects.create(text='новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.feed(), ['новый пост', 'старый пост'])
+
+    def test_follow_bulk(self):
+        """Подписка и отписка списком имён через JSON."""
+        url = reverse('posts:follow_bulk')
+        response = self.reader_client.post(
+            url,
+            json.dumps({'follow': ['writer', 'reader', 'nobody']}),
+            content_type='application/json'
+        )
+        self.assertEqual(
+            response.json(),
+            {'followed': 1, 'unfollowed': 0, 'unknown': ['nobody']}
+        )
+        self.assertEqual(self.feed(), ['старый пост'])
+        response = self.reader_client.post(
+            url,
+            json.dumps({'unfollow': ['writer']}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.json()['unfollowed'], 1)
+        self.assertEqual(self.feed(), [])
+        response = self.reader_client.post(
+            url, '[1]', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_following_cache(self):
+        """Состояние подписки берётся из кэша и сбрасывается подпиской."""
+        cache.clear()
+        profile = reverse(
+            'posts:profile',
+            kwargs={'username': FollowTimelineTest.author.username}
+        )
+        self.assertContains(self.reader_client.get(profile), 'Подписаться')
+        self.assertFalse(is_following(self.reader, self.author))
+        self.follow()
+        self.assertContains(self.reader_client.get(profile), 'Отписаться')
+        # Сессия, пользователь, автор и строки страницы: счётчику постов
+        # навигация не доверяет; разметка постов — из кэша фрагментов
+        with self.assertNumQueries(4):
+            self.reader_client.get(profile)
+        # Набор запоминается на объекте пользователя до конца запроса
+        self.assertFalse(is_following(self.reader, self.author))
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertTrue(is_following(reader, self.author.pk))
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class PostDetailQueriesTest(TestCase):
+    client_class = BudgetClient
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='detail-group',
+            description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост с комментариями',
+            author=cls.author,
+            group=cls.group
+        )
+        for num in range(7):
+            commenter = User.objects.create_user(username=f'commenter{num}')
+            Comment.objects.create(
+                post=cls.post,
+                author=commenter,
+                text=f'комментарий {num}'
+            )
+
+    def test_post_detail_query_count(self):
+        """post_detail укладывается в постоянное число запросов."""
+        url = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': PostDetailQueriesTest.post.id}
+        )
+        # Состояние поста для ETag, сам пост и страница комментариев
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['comments']), 5)
+
+    def test_query_budget_reports_sql(self):
+        """Превышение бюджета показывает выполненные запросы."""
+        with self.assertRaisesMessage(AssertionError, 'posts_comment'):
+            with query_budget(0):
+                list(Comment.objects.all())
+
+    def test_post_detail_comments_second_page(self):
+        """Комментарии разбиты на страницы."""
+        response = self.client.get(
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': PostDetailQueriesTest.post.id}
+            ) + '?comments_page=2'
+        )
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['комментарий 5', 'комментарий 6']
+        )
+
+    def test_stale_comments_count_does_not_hide_comments(self):
+        """Заниженный comments_count не обрезает страницы комментариев."""
+        Post.objects.update(comments_count=0)
+        response = self.client.get(
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': PostDetailQueriesTest.post.id}
+            ) + '?comments_page=2'
+        )
+        self.assertEqual(len(response.context['comments']), 2)
+        self.assertEqual(response.context['comments'].paginator.count, 7)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='searcher')
+
+    def create_posts(self):
+        self.cat = Post.objects.create(
+            text='Кошка спит на диване', author=self.user
+        )
+        self.dog = Post.objects.create(
+            text='Собака гуляет во дворе', author=self.user
+        )
+        self.cats = Post.objects.create(
+            text='Кошка и кошка: две кошки', author=self.user
+        )
+        Comment.objects.create(
+            post=self.dog, author=self.user, text='А кошка спит'
+        )
+        # Индекс обновляет фоновая задача
+        drain()
+
+    def found(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return [post.pk for post in response.context['page_obj']]
+
+    def check_search(self):
+        self.assertEqual(
+            self.found('кошка'), [self.cats.pk, self.cat.pk, self.dog.pk]
+        )
+        self.assertEqual(self.found('СОБАКА'), [self.dog.pk])
+        self.assertEqual(self.found('кошка диване'), [self.cat.pk])
+        self.assertEqual(self.found('слон'), [])
+        self.assertEqual(self.found(''), [])
+
+    def test_search(self):
+        """Поиск по тексту постов и комментариев с ранжированием."""
+        self.create_posts()
+        self.check_search()
+
+    @override_settings(SEARCH_BACKEND='python')
+    def test_search_python_index(self):
+        """Запасной индекс SearchTerm ищет так же."""
+        self.create_posts()
+        self.check_search()
+        self.dog.delete()
+        self.assertEqual(self.found('собака'), [])
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_admin_search(self):
+        """Админка показывает все совпадения, без индекса — ищет по LIKE."""
+        self.create_posts()
+        self.client.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'admin-pass'
+        ))
+
+        def found(query):
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': query}
+            )
+            return {post.pk for post in response.context['cl'].result_list}
+
+        self.assertEqual(
+            found('кошка'), {self.cat.pk, self.dog.pk, self.cats.pk}
+        )
+        self.assertEqual(found('спит'), {self.cat.pk, self.dog.pk})
+        for post_id in Post.objects.values_list('pk', flat=True):
+            remove_post(post_id)
+        # Комментарии ищет только индекс
+        self.assertEqual(found('спит'), {self.cat.pk})
+
+
+class ConditionalGetTest(TestCase):
+    client_class = BudgetClient
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag-author')
+        cls.reader = User.objects.create_user(username='etag-reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertNotModified(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_etag_304(self):
+        """Повторный запрос с тем же ETag получает 304."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.assertNotModified(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_etag_changes(self):
+        """ETag меняется с постами, комментариями, подпиской и query."""
+        index = reverse('posts:index')
+        detail = reverse('posts:post_detail', args=[self.post.pk])
+        profile = reverse('posts:profile', args=[self.author.username])
+        index_etag = self.client.get(index)['ETag']
+        detail_etag = self.client.get(detail)['ETag']
+        self.assertNotEqual(
+            self.client.get(index, {'page': 2})['ETag'], index_etag
+        )
+        Comment.objects.create(post=self.post, author=self.reader, text='к')
+        self.assertNotEqual(self.client.get(detail)['ETag'], detail_etag)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=index_etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.client.force_login(self.reader)
+        self.assertNotEqual(self.client.get(index)['ETag'], index_etag)
+        profile_etag = self.client.get(profile)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertNotEqual(self.client.get(profile)['ETag'], profile_etag)
+
+    def test_last_modified_for_guests(self):
+        """Анонимы получают Last-Modified, авторизованные — только ETag."""
+        url = reverse('posts:index')
+        cache.set(CHANGED_KEY, time.time() - 10, None)
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertNotModified(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        # Изменение в текущей секунде: дата ещё может не сдвинуться
+        # от следующей правки, поэтому заголовка нет и 304 по дате тоже
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.client.force_login(self.reader)
+        self.assertFalse(self.client.get(url).has_header('Last-Modified'))
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='api-reader')
+        cls.author = User.objects.create_user(username='api-author')
+        cls.group = Group.objects.create(
+            title='Группа API', slug='api', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'пост {num}', author=cls.author, group=cls.group)
+            for num in range(5)
+        )
+        cls.post = Post.objects.create(
+            text='последний пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text='ок')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_posts_cursor_and_sparse_fields(self):
+        """Лента листается курсором и отдаёт только запрошенные поля."""
+        url = reverse('posts:api_posts')
+        with self.assertNumQueries(1) as context:
+            response = self.client.get(
+                url, {'fields': 'id,author', 'limit': 4}
+            )
+        # text из базы не читается, автор — через JOIN
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('"text"', sql)
+        self.assertIn('"username"', sql)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertNotIn(b': ', response.content)
+        data = json.loads(response.content)
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'author': 'api-author'}
+        )
+        self.assertEqual(len(data['results']), 4)
+        self.assertIsNone(data['previous'])
+        second = json.loads(self.client.get(
+            url, {'fields': 'id', 'limit': 4, 'cursor': data['next']}
+        ).content)
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            {post['id'] for post in data['results'] + second['results']},
+            set(Post.objects.values_list('pk', flat=True))
+        )
+
+    def test_unknown_field(self):
+        response = self.client.get(
+            reverse('posts:api_posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', json.loads(response.content)['error'])
+
+    def test_group_profile_and_comments(self):
+        recount_all()
+        group_posts = json.loads(self.client.get(
+            reverse('posts:api_group_posts', args=[self.group.slug]),
+            {'fields': 'text,group'}
+        ).content)
+        self.assertEqual(
+            group_posts['results'][0],
+            {'text': 'последний пост', 'group': 'api'}
+        )
+        self.assertEqual(
+            json.loads(self.client.get(
+                reverse('posts:api_groups'), {'fields': 'slug,posts_count'}
+            ).content),
+            {'results': [{'slug': 'api', 'posts_count': 6}]}
+        )
+        self.client.force_login(self.user)
+        profile = json.loads(self.client.get(
+            reverse('posts:api_profile', args=[self.author.username])
+        ).content)
+        self.assertEqual(profile['posts_count'], 6)
+        self.assertFalse(profile['following'])
+        comments = json.loads(self.client.get(
+            reverse('posts:api_comments', args=[self.post.pk]),
+            {'fields': 'author,text'}
+        ).content)
+        self.assertEqual(
+            comments,
+            {
+                'results': [{'author': 'api-reader', 'text': 'ок'}],
+                'count': 1,
+                'next': None,
+            }
+        )
+        detail = json.loads(self.client.get(
+            reverse('posts:api_post', args=[self.post.pk]),
+            {'fields': 'id,image,comments_count'}
+        ).content)
+        self.assertEqual(
+            detail,
+            {'id': self.post.pk, 'image': None, 'comments_count': 1}
+        )
+
+    def test_follow_feed(self):
+        url = reverse('posts:api_follow')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.UNAUTHORIZED
+        )
+        self.client.force_login(self.user)
+        self.assertEqual(
+            json.loads(self.client.get(url).content)['results'], []
+        )
+        Follow.objects.create(user=self.user, author=self.author)
+        data = json.loads(self.client.get(url, {'fields': 'id'}).content)
+        self.assertEqual(data['results'][0], {'id': self.post.pk})
+        self.assertEqual(
+            self.client.post(url).status_code,
+            HTTPStatus.METHOD_NOT_ALLOWED
+        )
+
+    def test_deferred_group_counter(self):
+        """Пост, загруженный без group, при смене группы меняет счётчики."""
+        recount_all()
+        post = Post.objects.only('id', 'text').get(pk=self.post.pk)
+        post.group = None
+        post.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 5)
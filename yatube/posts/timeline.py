@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+
+def is_prolific(author):
+    """Слишком много подписчиков, чтобы раскладывать посты по лентам."""
+    return UserCounters.objects.filter(
+        user=author,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def prolific_authors(user):
+    """id авторов из подписок user, чьи посты читаются при открытии ленты."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__counters__followers_count__gt=(
+                settings.TIMELINE_FANOUT_LIMIT
+            )
+        ).values_list('author', flat=True)
+    )
+
+
+def _add_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out_posts(post_ids):
+    """
+    Раскладывает новые посты по лентам подписчиков их авторов.
+    Популярные авторы и подписчики всех авторов пачки читаются
+    одним запросом каждый.
+    """
+    posts = Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'author', 'pub_date'
+    )
+    authors = {post_id: author_id for post_id, author_id, _ in posts}
+    prolific = set(
+        UserCounters.objects.filter(
+            user_id__in=set(authors.values()),
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)
+    )
+    posts_by_author = {}
+    for post_id, author_id, pub_date in posts:
+        if author_id not in prolific:
+            posts_by_author.setdefault(author_id, []).append(
+                (post_id, pub_date)
+            )
+    followers = Follow.objects.filter(
+        author__in=posts_by_author
+    ).values_list('author', 'user')
+    _add_entries(
+        TimelineEntry(
+            user_id=user_id, post_id=post_id, author_id=author_id,
+            pub_date=pub_date
+        )
+        for author_id, user_id in followers.iterator()
+        for post_id, pub_date in posts_by_author[author_id]
+    )
+
+
+def _recent_posts(author):
+    """(id, pub_date) последних TIMELINE_BACKFILL постов author."""
+    return list(
+        Post.objects.filter(
+            author=author
+        ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    )
+
+
+def backfill(user, author):
+    """Добавляет в ленту user последние посты author после подписки."""
+    if is_prolific(author):
+        return
+    _add_entries(
+        TimelineEntry(
+            user=user, post_id=post_id, author=author, pub_date=pub_date
+        )
+        for post_id, pub_date in _recent_posts(author)
+    )
+
+
+def backfill_many(edges):
+    """backfill() для множества пар (user_id, author_id) сразу."""
+    followers = {}
+    for user_id, author_id in edges:
+        followers.setdefault(author_id, []).append(user_id)
+    prolific = set(
+        UserCounters.objects.filter(
+            user_id__in=followers,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)
+    )
+    for author_id, user_ids in followers.items():
+        if author_id in prolific:
+            continue
+        posts = _recent_posts(author_id)
+        _add_entries(
+            TimelineEntry(
+                user_id=user_id, post_id=post_id, author_id=author_id,
+                pub_date=pub_date
+            )
+            for user_id in user_ids
+            for post_id, pub_date in posts
+        )
+
+
+def trim(user, author):
+    """Убирает из ленты user посты author после отписки."""
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def trim_many(edges):
+    """trim() для множества пар (user_id, author_id): запрос на подписчика."""
+    authors = {}
+    for user_id, author_id in edges:
+        authors.setdefault(user_id, []).append(author_id)
+    for user_id, author_ids in authors.items():
+        TimelineEntry.objects.filter(
+            user_id=user_id, author_id__in=author_ids
+        ).delete()
+
+
+def refill_followers(author):
+    """
+    Автор перестал быть «популярным»: его посты больше не дочитываются
+    при открытии ленты, поэтому раскладываем их всем подписчикам.
+    """
+    posts = _recent_posts(author)
+    followers = Follow.objects.filter(
+        author=author
+    ).values_list('user', flat=True)
+    _add_entries(
+        TimelineEntry(
+            user_id=user_id, post_id=post_id, author=author,
+            pub_date=pub_date
+        )
+        for user_id in followers.iterator()
+        for post_id, pub_date in posts
+    )
+
+
+def timeline(user):
+    """
+    Лента подписок user. Обычно это одно чтение по индексу
+    TimelineEntry(user, -pub_date, -post): сортировка и курсор идут
+    по копиям pub_date и id в самой записи ленты (feed_date, feed_post),
+    и TEMP B-TREE не нужен. Посты популярных авторов дочитываются
+    из Post напрямую (fan-out on read).
+    """
+    prolific = prolific_authors(user)
+    if not prolific:
+        # annotate после filter использует тот же JOIN с записью ленты
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post'),
+        ).order_by('-feed_date', '-feed_post')
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=prolific)
+    )
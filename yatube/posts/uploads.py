@@ -0,0 +1,74 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+
+# Форматы, которые пересохраняем без метаданных
+REENCODE_FORMATS = ('JPEG', 'PNG', 'WEBP', 'TIFF', 'MPO')
+
+
+class OversizedUpload(UploadedFile):
+    """Заглушка вместо файла, превысившего POST_IMAGE_MAX_UPLOAD_SIZE."""
+
+    def __init__(self, name, content_type, size):
+        super().__init__(BytesIO(), name, content_type, size)
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """
+    Первый в FILE_UPLOAD_HANDLERS. Пропускает куски файла дальше,
+    пока не превышен POST_IMAGE_MAX_UPLOAD_SIZE, а потом перестаёт
+    их передавать: остаток запроса читается, но никуда не пишется.
+    Форма получит OversizedUpload и покажет ошибку.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            self.oversized = True
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.oversized:
+            return OversizedUpload(
+                self.file_name, self.content_type, self.received
+            )
+        return None
+
+
+def prepare_image(upload):
+    """
+    Убирает EXIF и уменьшает картинку больше POST_IMAGE_MAX_SIDE.
+    Маленькие картинки без метаданных возвращаются как есть.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        max_side = settings.POST_IMAGE_MAX_SIDE
+        too_big = max(image.size) > max_side
+        has_metadata = bool(image.info.get('exif')) or bool(image.getexif())
+        if not too_big and not (
+            has_metadata and image_format in REENCODE_FORMATS
+        ):
+            upload.seek(0)
+            return upload
+        if image_format == 'JPEG':
+            # Декодируем JPEG сразу в уменьшенном масштабе: меньше памяти
+            image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = BytesIO()
+        options = {'quality': 90} if image_format in ('JPEG', 'WEBP') else {}
+        image.save(output, image_format, **options)
+    return ContentFile(output.getvalue(), name=upload.name)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -11,6 +11,8 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
+    # Поиск
+    path('search/', views.search, name='search'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     # Новая запись
@@ -28,8 +30,30 @@ urlpatterns = [
         'profile/<str:username>/follow/',
         views.profile_follow, name='profile_follow',
     ),
+    path('follow/bulk/', views.follow_bulk, name='follow_bulk'),
     # Отписка
     path('profile/<str:username>/unfollow/',
     views.profile_unfollow, name='profile_unfollow'
     ),
+    # JSON API для чтения
+    path('api/v1/posts/', api.posts, name='api_posts'),
+    path('api/v1/posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path(
+        'api/v1/posts/<int:post_id>/comments/',
+        api.post_comments, name='api_comments'
+    ),
+    path('api/v1/groups/', api.groups, name='api_groups'),
+    path(
+        'api/v1/groups/<slug:slug>/posts/',
+        api.group_posts, name='api_group_posts'
+    ),
+    path(
+        'api/v1/profiles/<str:username>/',
+        api.profile, name='api_profile'
+    ),
+    path(
+        'api/v1/profiles/<str:username>/posts/',
+        api.profile_posts, name='api_profile_posts'
+    ),
+    path('api/v1/follow/', api.follow_posts, name='api_follow'),
 ]
@@ -1,8 +1,311 @@
-from django.core.paginator import Paginator
-from yatube.settings import POSTS_PER_PAGE
+import base64
+import binascii
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
-def paginate_page(request, post_list):
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    return paginator.get_page(page_number)
+CURSOR_NEXT = 'next'
+CURSOR_PREVIOUS = 'prev'
+ESTIMATE_KEY = 'posts:estimate:{table}'
+
+
+def encode_cursor(direction, post):
+    """Упаковывает позицию поста (pub_date, id) в непрозрачную строку."""
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Распаковывает курсор в (направление, pub_date, id).
+    Для пустого или испорченного курсора возвращает (None, None, None),
+    то есть первую страницу.
+    """
+    if not cursor:
+        return None, None, None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, pub_date, pk = raw.decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None, None, None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None, None, None
+    return direction, pub_date, pk
+
+
+class CursorPage:
+    """Страница курсорной паджинации, совместимая с шаблонами Page."""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, cursor=None,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Паджинатор по ключу (pub_date, id) из Post.Meta.ordering.
+    Вместо COUNT(*) и OFFSET делает один запрос с условием по ключу,
+    поэтому глубокие страницы открываются так же быстро, как первая.
+    Если у queryset задана явная сортировка по двум полям с теми же
+    значениями (feed_date, feed_post ленты подписок), ключ — они.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        ordering = object_list.query.order_by or ('-pub_date', '-pk')
+        self.date_field, self.pk_field = (
+            field.lstrip('-') for field in ordering[:2]
+        )
+
+    def _beyond(self, lookup, pub_date, pk):
+        """Строки после (pub_date, pk) по ключу; lookup — lt или gt."""
+        return Q(**{f'{self.date_field}__{lookup}': pub_date}) | Q(**{
+            self.date_field: pub_date, f'{self.pk_field}__{lookup}': pk
+        })
+
+    def _ordered(self, queryset, descending=True):
+        sign = '-' if descending else ''
+        return queryset.order_by(
+            sign + self.date_field, sign + self.pk_field
+        )
+
+    def _fetch(self, queryset):
+        rows = list(queryset[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def get_page(self, cursor):
+        direction, pub_date, pk = decode_cursor(cursor)
+        queryset = self.object_list
+        if direction == CURSOR_NEXT:
+            rows, has_next = self._fetch(self._ordered(
+                queryset.filter(self._beyond('lt', pub_date, pk))
+            ))
+            has_previous = bool(rows)
+        elif direction == CURSOR_PREVIOUS:
+            rows, has_previous = self._fetch(self._ordered(
+                queryset.filter(self._beyond('gt', pub_date, pk)),
+                descending=False
+            ))
+            rows.reverse()
+            has_next = bool(rows)
+        if direction is None or not rows:
+            cursor = None
+            rows, has_next = self._fetch(self._ordered(queryset))
+            has_previous = False
+        return CursorPage(
+            rows,
+            self,
+            cursor=cursor,
+            next_cursor=(
+                encode_cursor(CURSOR_NEXT, rows[-1]) if has_next else None
+            ),
+            previous_cursor=(
+                encode_cursor(CURSOR_PREVIOUS, rows[0])
+                if has_previous else None
+            ),
+        )
+
+
+def page_window(number, num_pages, on_each_side=None, on_ends=None):
+    """
+    Номера страниц для навигации: on_ends первых и последних и
+    on_each_side вокруг текущей; None на месте пропуска.
+    page_window(50, 100, 2, 1) == [1, None, 48, 49, 50, 51, 52, None, 100]
+    """
+    if on_each_side is None:
+        on_each_side = settings.PAGINATOR_ON_EACH_SIDE
+    if on_ends is None:
+        on_ends = settings.PAGINATOR_ON_ENDS
+    pages = set(range(1, min(on_ends, num_pages) + 1))
+    pages.update(range(max(1, num_pages - on_ends + 1), num_pages + 1))
+    pages.update(range(
+        max(1, number - on_each_side),
+        min(num_pages, number + on_each_side) + 1
+    ))
+    window, previous = [], 0
+    for page in sorted(pages):
+        if page - previous == 2:
+            # Вместо многоточия на месте одной страницы — сама страница
+            window.append(previous + 1)
+        elif page - previous > 2:
+            window.append(None)
+        window.append(page)
+        previous = page
+    return window
+
+
+class HintedPaginator(Paginator):
+    """
+    Paginator, которому число объектов подсказано заранее
+    (денормализованный счётчик или approximate_count), чтобы не делать
+    COUNT(*). Подсказка задаёт только номера страниц: страница читается
+    с запасом в одну строку и, если не сходится с подсказкой, число
+    берётся по самой странице или из COUNT(*). Поэтому разошедшийся
+    счётчик не прячет посты и не показывает пустые страницы.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        # Пока число — подсказка, а не COUNT(*) или конец списка
+        self.hinted = count is not None
+        if count is not None:
+            self._set_count(count)
+
+    def _set_count(self, count, exact=False):
+        # count и num_pages — cached_property Paginator
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+        if exact:
+            self.hinted = False
+
+    def _recount(self):
+        self.__dict__.pop('count', None)
+        self.__dict__.pop('num_pages', None)
+        self.hinted = False
+
+    def validate_number(self, number):
+        """Номер за пределами подсказки page() проверит по строкам."""
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.hinted:
+                raise
+            number = int(number)
+            if number < 1:
+                raise
+            return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            if number >= self.num_pages:
+                # Подсказка занижена: за этой страницей есть ещё посты
+                self._recount()
+        elif rows or number == 1:
+            # Последняя страница: по ней видно точное число
+            self._set_count(bottom + len(rows), exact=True)
+        else:
+            # Подсказка завышена: страница за концом списка
+            self._recount()
+            raise EmptyPage('That page contains no results')
+        return self._get_page(rows, number, self)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # page() уже уточнил число объектов по COUNT(*)
+            return self.page(self.num_pages)
+
+
+def _numbered_page(paginator, number):
+    page = paginator.get_page(number)
+    page.page_window = page_window(page.number, paginator.num_pages)
+    return page
+
+
+def approximate_count(model):
+    """
+    Оценка числа строк всей таблицы model без COUNT(*): max(id)
+    в SQLite, reltuples из статистики в Postgres. Оценка кэшируется
+    на POSTS_ESTIMATE_TIMEOUT. Возвращает None, если оценка выключена,
+    недоступна или меньше POSTS_APPROXIMATE_COUNT_MIN: небольшие
+    таблицы дешевле посчитать точно.
+    """
+    if settings.POSTS_COUNT_MODE != 'approximate':
+        return None
+    table = model._meta.db_table
+    key = ESTIMATE_KEY.format(table=table)
+    estimate = cache.get(key)
+    if estimate is None:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE relname = %s',
+                    [table]
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(f'SELECT MAX(id) FROM {table}')
+            else:
+                return None
+            row = cursor.fetchone()
+        estimate = int(row[0] or 0) if row else 0
+        cache.set(key, estimate, settings.POSTS_ESTIMATE_TIMEOUT)
+    if estimate < settings.POSTS_APPROXIMATE_COUNT_MIN:
+        return None
+    return estimate
+
+
+def paginate_page(request, post_list, count=None):
+    """
+    Страница постов. count — подсказка числа постов
+    (денормализованный счётчик или approximate_count), чтобы
+    не делать COUNT(*); см. HintedPaginator.
+    """
+    if settings.POSTS_PAGINATION == 'cursor':
+        paginator = CursorPaginator(post_list, settings.POSTS_PER_PAGE)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = HintedPaginator(
+        post_list, settings.POSTS_PER_PAGE, count=count
+    )
+    return _numbered_page(paginator, request.GET.get("page"))
+
+
+def paginate_comments(request, comments, count=None):
+    """Страница комментариев; count — подсказка Post.comments_count."""
+    paginator = HintedPaginator(
+        comments, settings.COMMENTS_PER_PAGE, count=count
+    )
+    return paginator.get_page(request.GET.get('comments_page'))
+
+
+def paginate_search(request, post_ids):
+    """Страница результатов поиска: посты в порядке post_ids."""
+    from .models import Post
+
+    paginator = Paginator(post_ids, settings.POSTS_PER_PAGE)
+    page = _numbered_page(paginator, request.GET.get('page'))
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        page.object_list
+    )
+    page.object_list = [
+        posts[post_id] for post_id in page.object_list if post_id in posts
+    ]
+    return page
@@ -1,13 +1,35 @@
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import redirect, render, get_object_or_404
-from .utils import paginate_page
-from .models import Follow, Post, Group, User, Comment
+from django.views.decorators.http import condition, require_POST
+from django.views.decorators.vary import vary_on_cookie
+from . import conditional
+from .follows import follow_many, unfollow_many
+from .counters import user_counters
+from .images import schedule_thumbnail
+from .search import search as search_posts
+from .utils import (
+    approximate_count, paginate_comments, paginate_page, paginate_search
+)
+from .timeline import timeline
+from .models import Follow, Post, Group, User
 from .forms import PostForm, CommentForm
 from django.contrib.auth.decorators import login_required
 
 
+@vary_on_cookie
+@condition(
+    etag_func=conditional.index_etag,
+    last_modified_func=conditional.feed_last_modified
+)
 def index(request):
     post_list = Post.objects.select_related("group", "author")
-    page_obj = paginate_page(request, post_list)
+    page_obj = paginate_page(
+        request, post_list, count=approximate_count(Post)
+    )
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
@@ -15,11 +37,16 @@ def index(request):
     return render(request, template, context)
 
 
+@vary_on_cookie
+@condition(
+    etag_func=conditional.group_etag,
+    last_modified_func=conditional.feed_last_modified
+)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related("author", "group")
-    page_obj = paginate_page(request, posts)
+    page_obj = paginate_page(request, posts, count=group.posts_count)
     context = {
         'group': group,
         'page_obj': page_obj
@@ -27,33 +54,60 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@vary_on_cookie
+@condition(
+    etag_func=conditional.profile_etag,
+    last_modified_func=conditional.feed_last_modified
+)
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    page_obj = paginate_page(request, posts)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user.id,
-            author=author.id
-        ).exists()
-    else:
-        following = False
+    author = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username
+    )
+    counters = user_counters(author)
+    posts = author.posts.select_related("author", "group")
+    page_obj = paginate_page(request, posts, count=counters.posts_count)
     context = {
         'author': author,
+        'counters': counters,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = paginate_search(request, search_posts(query))
+    context = {
+        'query': query,
         'page_obj': page_obj,
-        'following': following
+        'extra_query': urlencode({'q': query}) + '&',
     }
     return render(request, template, context)
 
 
+@vary_on_cookie
+@condition(
+    etag_func=conditional.post_etag,
+    last_modified_func=conditional.post_last_modified
+)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group', 'author__counters'),
+        pk=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
+    comments = paginate_comments(
+        request,
+        post.comments.select_related('author').order_by('created', 'pk'),
+        count=post.comments_count
+    )
     context = {
         'post': post,
+        'author_counters': user_counters(post.author),
         'form': form,
         'comments': comments
     }
@@ -74,6 +128,8 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            if post.image:
+                schedule_thumbnail(post)
             return redirect('posts:profile', request.user)
     form = PostForm()
     return render(request, template, context)
@@ -91,7 +147,14 @@ def post_edit(request, post_id):
     context = {'form': form, 'is_edit': is_edit, 'post': post}
     if request.method == 'POST':
         if form.is_valid():
-            post = form.save()
+            post = form.save(commit=False)
+            image_changed = 'image' in form.changed_data
+            if image_changed:
+                # Пока новое превью не готово, шаблоны покажут оригинал
+                post.thumbnail = ''
+            post.save()
+            if image_changed:
+                schedule_thumbnail(post)
             return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', context)
 
@@ -109,8 +172,8 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate_page(request, post)
+    posts = timeline(request.user).select_related('author', 'group')
+    page_obj = paginate_page(request, posts)
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
@@ -129,3 +192,52 @@ def profile_unfollow(request, username):
         author=author
     ).delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def follow_bulk(request):
+    """
+    Подписка и отписка списком: POST с JSON
+    {"follow": ["имя", ...], "unfollow": ["имя", ...]}.
+    """
+    try:
+        payload = json.loads(request.body)
+        names = {
+            action: list(payload.get(action, []))
+            for action in ('follow', 'unfollow')
+        }
+        if not all(
+            isinstance(name, str)
+            for values in names.values() for name in values
+        ):
+            raise ValueError
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse(
+            {'error': 'Ожидается JSON-объект со списками имён'}, status=400
+        )
+    if sum(map(len, names.values())) > settings.FOLLOW_BULK_MAX:
+        return JsonResponse(
+            {'error': f'Не больше {settings.FOLLOW_BULK_MAX} имён'},
+            status=400
+        )
+    authors = dict(
+        User.objects.filter(
+            username__in=names['follow'] + names['unfollow']
+        ).values_list('username', 'pk')
+    )
+    edges = {
+        action: [
+            (request.user.pk, authors[name])
+            for name in action_names if name in authors
+        ]
+        for action, action_names in names.items()
+    }
+    return JsonResponse({
+        'followed': follow_many(edges['follow']),
+        'unfollowed': unfollow_many(edges['unfollow']),
+        'unknown': sorted(
+            {name for values in names.values() for name in values}
+            - set(authors)
+        ),
+    })
@@ -1,5 +1,9 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.sites.shortcuts import get_current_site
+
+from .tasks import send_password_reset
 
 
 User = get_user_model()
@@ -9,3 +13,39 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = 'first_name', 'last_name', 'username', 'email'
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """
+    Письмо со ссылкой сброса отправляет воркер очереди: форма
+    не ждёт почтовый сервер. В задачу попадает только id пользователя,
+    токен и ссылку строит воркер (users.tasks.send_password_reset),
+    поэтому в core_job не остаётся действующих ссылок. Токен всегда
+    от default_token_generator.
+    """
+
+    def save(self, domain_override=None,
+             subject_template_name='registration/password_reset_subject.txt',
+             email_template_name='registration/password_reset_email.html',
+             use_https=False, token_generator=default_token_generator,
+             from_email=None, request=None, html_email_template_name=None,
+             extra_email_context=None):
+        if domain_override:
+            site_name = domain = domain_override
+        else:
+            current_site = get_current_site(request)
+            site_name, domain = current_site.name, current_site.domain
+        send_password_reset.delay_many(
+            {
+                'user_id': user.pk,
+                'domain': domain,
+                'site_name': site_name,
+                'use_https': use_https,
+                'subject_template_name': subject_template_name,
+                'email_template_name': email_template_name,
+                'html_email_template_name': html_email_template_name,
+                'from_email': from_email,
+                'extra_email_context': extra_email_context,
+            }
+            for user in self.get_users(self.cleaned_data['email'])
+        )
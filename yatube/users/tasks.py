@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives
+from django.template import loader
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core import mail
+from core.jobs import enqueue, task
+
+User = get_user_model()
+
+
+@task()
+def send_password_reset(user_id, domain, site_name, use_https,
+                        subject_template_name, email_template_name,
+                        html_email_template_name=None, from_email=None,
+                        extra_email_context=None):
+    """
+    Письмо со ссылкой сброса пароля. Токен строится здесь, при отправке,
+    а письмо уходит сразу, а не через core.send_mails: иначе живая
+    ссылка лежала бы в очереди. Лимит EMAIL_RATE_LIMIT на адрес тот же,
+    что у остальной почты: сверх него задача откладывается до
+    следующего окна. Ошибка почтового сервера — повтор задачи.
+    """
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        return
+    email = getattr(user, User.get_email_field_name())
+    window = mail._window()
+    if not mail._within_limit([email], window, {}):
+        enqueue(
+            send_password_reset.name,
+            run_at=mail._next_window_at(window),
+            user_id=user_id,
+            domain=domain,
+            site_name=site_name,
+            use_https=use_https,
+            subject_template_name=subject_template_name,
+            email_template_name=email_template_name,
+            html_email_template_name=html_email_template_name,
+            from_email=from_email,
+            extra_email_context=extra_email_context,
+        )
+        return
+    context = {
+        'email': email,
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': 'https' if use_https else 'http',
+        **(extra_email_context or {}),
+    }
+    subject = loader.render_to_string(subject_template_name, context)
+    message = EmailMultiAlternatives(
+        ''.join(subject.splitlines()),
+        loader.render_to_string(email_template_name, context),
+        from_email,
+        [email],
+    )
+    if html_email_template_name is not None:
+        message.attach_alternative(
+            loader.render_to_string(html_email_template_name, context),
+            'text/html'
+        )
+    message.send()
+    sent = {}
+    mail._count([email], window, sent)
+    mail._save_counts(sent)
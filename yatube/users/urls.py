@@ -7,6 +7,8 @@ from django.contrib.auth.views import PasswordResetCompleteView
 from django.contrib.auth.views import PasswordResetConfirmView
 from django.urls import path
 
+from .forms import QueuedPasswordResetForm
+
 app_name = 'users'
 
 urlpatterns = [
@@ -41,7 +43,7 @@ urlpatterns = [
     ),
     path(
         'password_reset/',
-        PasswordResetView.as_view(),
+        PasswordResetView.as_view(form_class=QueuedPasswordResetForm),
         name='password_reset_form'
     ),
     path(
@@ -0,0 +1,28 @@
+"""
+ASGI config for yatube project.
+
+Django 2.2 не умеет ASGI сам, поэтому обычный WSGI-обработчик
+оборачивается в core.asgi.AsgiHandler: соединения обслуживает цикл
+событий сервера (uvicorn, daphne, hypercorn), а view выполняются
+в ограниченном пуле потоков. Запуск:
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+wsgi_application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+from core.asgi import AsgiHandler  # noqa: E402
+
+application = AsgiHandler(wsgi_application)
+
+if settings.TEMPLATES_PRELOAD:
+    from core.template_cache import warm_templates  # noqa: E402
+    warm_templates()
@@ -0,0 +1,14 @@
+"""
+Настройки выбираются переменной окружения DJANGO_ENV:
+dev (по умолчанию) или prod.
+"""
+import os
+
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'dev')
+
+if DJANGO_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif DJANGO_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ValueError(f'Неизвестное окружение DJANGO_ENV={DJANGO_ENV!r}')
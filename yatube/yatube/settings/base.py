@@ -0,0 +1,363 @@
+"""
+Django settings for yatube project: общие для всех окружений.
+Окружение выбирает yatube/settings/__init__.py по DJANGO_ENV.
+
+Generated by 'django-admin startproject' using Django 2.2.19.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import importlib.util
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = '$fv!66^2a@(=$h9odd267you0%-urp6beh38e=fe_vx%8376(#'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+# При DEBUG Django хранит каждый SQL-запрос в памяти; включается в dev
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.template.context_processors.media',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+# Компилировать все шаблоны при старте WSGI/ASGI-процесса (с cached.Loader)
+TEMPLATES_PRELOAD = False
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+# ASGI (yatube.asgi): view выполняются в пуле из ASGI_THREADS потоков;
+# если ещё ASGI_MAX_PENDING запросов ждут потока, новые получают 503
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 64))
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# Профиль базы выбирается переменной DB_PROFILE: sqlite (по умолчанию)
+# или postgres (нужен psycopg2, параметры — из POSTGRES_*)
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+# Соединение живёт между запросами, а не открывается на каждый
+CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DATABASE_PROFILES = {
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            'SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        # Сколько секунд ждать снятия блокировки записи
+        'OPTIONS': {'timeout': 20},
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'yatube'),
+        'USER': os.environ.get('POSTGRES_USER', 'yatube'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+    },
+}
+DATABASES = {
+    'default': DATABASE_PROFILES[DB_PROFILE]
+}
+# PRAGMA для каждого нового соединения SQLite (core.signals).
+# WAL: читатели не блокируются писателем
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Реплики только для чтения, через запятую: для sqlite — пути к копиям
+# (их обновляет manage.py sync_replicas), для postgres — хосты реплик
+DATABASE_REPLICAS = []
+for num, location in enumerate(
+    filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')),
+    start=1
+):
+    replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    replica['HOST' if DB_PROFILE == 'postgres' else 'NAME'] = location
+    DATABASES[f'replica{num}'] = replica
+    DATABASE_REPLICAS.append(f'replica{num}')
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Какие страницы читают с реплик
+REPLICA_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:api_posts',
+    'posts:api_post',
+    'posts:api_comments',
+    'posts:api_groups',
+    'posts:api_group_posts',
+    'posts:api_profile',
+    'posts:api_profile_posts',
+    'posts:api_follow',
+}
+# Сколько секунд после записи пользователь читает только из default
+REPLICA_PIN_SECONDS = 10
+# Заголовок X-DB-Queries с числом запросов по каждой базе
+DB_QUERIES_HEADER = False
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_URL = '/static/'
+
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+
+# EMAIL
+
+# Письма ставятся в очередь (core.mail.queue_mail) и уходят пачками
+# через одно соединение. Без EMAIL_HOST пачки пишутся в файлы
+# sent_emails/ и сжимаются в суточные архивы sent_emails/archive/.
+# Для проверки SMTP локально: EMAIL_HOST=localhost EMAIL_PORT=1025 и
+# отладочный сервер python -m aiosmtpd -n -l localhost:1025
+# (или python -m smtpd -n -c DebuggingServer localhost:1025 до Python 3.12)
+EMAIL_HOST = os.environ.get('EMAIL_HOST', '')
+if EMAIL_HOST:
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+    EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+    EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+    EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '') == '1'
+    EMAIL_TIMEOUT = 10
+else:
+    EMAIL_BACKEND = 'core.mail.RotatingFileBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_ARCHIVE_DAYS = 30
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@yatube.ru')
+# Не больше EMAIL_RATE_LIMIT писем на адрес за EMAIL_RATE_WINDOW секунд
+EMAIL_RATE_LIMIT = 20
+EMAIL_RATE_WINDOW = 60 * 60
+# Уведомления о новых подписчиках и новых постах авторов из подписок
+NOTIFY_NEW_FOLLOWER = True
+NOTIFY_NEW_POST = True
+# Адрес сайта для ссылок в письмах
+SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
+
+# PAGINATOR
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 50
+# 'page' — номера страниц, 'cursor' — курсорная паджинация по (pub_date, id)
+POSTS_PAGINATION = 'page'
+# Навигация: столько страниц вокруг текущей и с каждого края
+PAGINATOR_ON_EACH_SIDE = 2
+PAGINATOR_ON_ENDS = 1
+# 'approximate' — для больших таблиц число постов на главной оценивается
+# (max(id) в SQLite, reltuples в Postgres) вместо COUNT(*); 'exact' — всегда
+# точный COUNT(*). Таблицы меньше порога всё равно считаются точно
+POSTS_COUNT_MODE = 'approximate'
+POSTS_APPROXIMATE_COUNT_MIN = 10000
+POSTS_ESTIMATE_TIMEOUT = 60
+# Наибольший ?limit= страницы ленты в JSON API
+API_MAX_LIMIT = 100
+
+# SEARCH
+# 'auto' — SQLite FTS5, если таблица есть, иначе индекс SearchTerm
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_RESULTS = 1000
+# За столько дней возраста релевантность поста падает вдвое
+SEARCH_RECENCY_DAYS = 30
+
+# TIMELINE
+# Посты авторов, у которых подписчиков больше лимита, не раскладываются
+# по лентам, а дочитываются из Post при открытии ленты
+TIMELINE_FANOUT_LIMIT = 1000
+# Сколько последних постов автора добавить в ленту при подписке
+TIMELINE_BACKFILL = 100
+# Размер пачки для bulk_create при раскладке
+TIMELINE_BATCH_SIZE = 500
+# Массовые подписки: размер пачки и лимит пар в одном запросе к API
+FOLLOW_BATCH_SIZE = 500
+FOLLOW_BULK_MAX = 1000
+
+# JOBS
+# Фоновые задачи (core.jobs) выполняют воркеры: manage.py run_workers.
+# JOBS_EAGER — выполнять задачи сразу при постановке, без воркеров
+# (включено в dev.py; в prod без воркеров задачи копятся в очереди)
+JOBS_EAGER = False
+# Сколько задач воркер берёт за раз и на сколько секунд их занимает
+JOBS_BATCH_SIZE = 100
+JOBS_LEASE = 300
+# Попыток до состояния failed; пауза перед повтором растёт вдвое
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+# Пауза воркера, когда задач нет
+JOBS_IDLE_SLEEP = 1
+
+# 403
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Image
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Превью постов создаёт задача очереди posts.make_thumbnails
+POST_THUMBNAIL_SIZE = (960, 339)
+# Ширины и форматы превью для srcset; недоступные в Pillow пропускаются
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('avif', 'webp', 'jpeg')
+POST_THUMBNAIL_QUALITY = 85
+
+# Загрузки: файлы больше 256 КБ пишутся на диск кусками, а не в память.
+# Всё, что больше POST_IMAGE_MAX_UPLOAD_SIZE, дочитывается без записи
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.SizeLimitUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+# Проверяется по заголовку, до декодирования картинки
+POST_IMAGE_MAX_PIXELS = 40_000_000
+# Оригиналы больше этой стороны уменьшаются перед сохранением
+POST_IMAGE_MAX_SIDE = 2560
+
+# Фрагменты лент сбрасываются сменой поколения, поэтому TTL большой
+POSTS_CACHE_TIMEOUT = 60 * 60 * 24
+# Набор подписок пользователя; сбрасывается сигналами Follow
+FOLLOWING_CACHE_TIMEOUT = 60 * 60
+
+# Кэш: locmem — свой в каждом процессе; file и db — общий для всех
+# воркеров без внешних сервисов; redis — если установлен django-redis
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis' and not importlib.util.find_spec('django_redis'):
+    CACHE_BACKEND = 'file'
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+    },
+    # Перед первым запуском: python manage.py createcachetable
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', 'redis://127.0.0.1:6379/1'
+        ),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND]
+}
+# Защита от одновременной пересборки одного ключа
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_POLL = 0.05
+CACHE_EARLY_EXPIRATION_BETA = 1.0
@@ -0,0 +1,9 @@
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+DB_QUERIES_HEADER = True
+
+# Без run_workers задачи очереди (превью, ленты подписок, поиск, почта)
+# в разработке выполняются сразу при постановке
+JOBS_EAGER = True
@@ -0,0 +1,52 @@
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+
+# Скомпилированные шаблоны живут в памяти процесса
+TEMPLATES = [
+    dict(
+        TEMPLATES[0],
+        APP_DIRS=False,
+        OPTIONS=dict(
+            TEMPLATES[0]['OPTIONS'],
+            loaders=[
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        ),
+    ),
+]
+TEMPLATES_PRELOAD = True
+
+# collectstatic кладёт файлы с хэшем в имени: их можно кэшировать вечно
+STATIC_ROOT = os.environ.get(
+    'DJANGO_STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles')
+)
+STATICFILES_STORAGE = (
+    'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+)
+
+# Медиа отдаёт веб-сервер или CDN из MEDIA_ROOT, а не Django
+MEDIA_URL = os.environ.get('DJANGO_MEDIA_URL', '/media/')
+
+# Без DEBUG запросы не копятся в connection.queries; на всякий случай
+# не пишем и лог django.db.backends
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'loggers': {
+        'django.db.backends': {
+            'handlers': [],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}